@@ -4,5 +4,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "asterviz.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
 
+# Imported after Django is set up: it touches models.
+from solar.live import positions_socket, reject_socket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    "/ws/positions/": positions_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        handler = WEBSOCKET_ROUTES.get(scope["path"], reject_socket)
+        await handler(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
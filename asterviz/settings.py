@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -49,12 +50,48 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "asterviz.wsgi.application"
 
+# ASTERVIZ_DB_PROFILE=production turns on WAL journaling, connection reuse and
+# the cache/mmap pragmas below (applied on connect by solar.db).
+DB_PATH = Path(os.environ.get("ASTERVIZ_DB_PATH", BASE_DIR / "db.sqlite3"))
+DB_PROFILE = os.environ.get("ASTERVIZ_DB_PROFILE", "dev")
+_PRODUCTION_DB = DB_PROFILE == "production"
+_CONN_MAX_AGE = 600 if _PRODUCTION_DB else 0
+
 DATABASES = {
+    # Writes (migrations, import_dataset, seed_demo) go through the primary alias.
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "NAME": DB_PATH,
+        "CONN_MAX_AGE": _CONN_MAX_AGE,
+        "OPTIONS": {"timeout": 20},
+    },
+    # Same file opened read-only; API views read through this alias so that,
+    # under WAL, an import never blocks them.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": f"file:{DB_PATH.as_posix()}?mode=ro",
+        "CONN_MAX_AGE": _CONN_MAX_AGE,
+        "OPTIONS": {"timeout": 20},
+        "TEST": {"MIRROR": "default"},
+    },
 }
+SOLAR_READ_DB = "replica"
+
+# Query timing exposed at /api/_metrics/ for the loadtest command; off by default.
+SOLAR_DB_METRICS = os.environ.get("ASTERVIZ_DB_METRICS") == "1"
+SOLAR_DB_SLOW_MS = 50.0  # queries at least this slow are counted as slow
+
+SQLITE_PRAGMAS: dict[str, str | int] = (
+    {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # KiB, i.e. 64 MiB page cache per connection
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    }
+    if _PRODUCTION_DB
+    else {}
+)
 
 AUTH_PASSWORD_VALIDATORS: list[dict] = []
 
@@ -69,6 +106,15 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Holds integrated n-body trajectories; point this at a shared backend
+# (file, redis, memcached) when running several server processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -76,3 +122,22 @@ REST_FRAMEWORK = {
     ],
 }
 
+
+# Heavy endpoints (ephemeris, batch ephemeris, explore) are async views that
+# offload work to bounded pools; serve with an ASGI server (asterviz.asgi) so
+# cheap endpoints stay responsive while they run.
+SOLAR_COMPUTE_PROCESSES = 2  # process pool for CPU-bound propagation
+SOLAR_COMPUTE_THREADS = 4  # thread pool for ORM / serialization of heavy requests
+SOLAR_COMPUTE_MAX_INFLIGHT = 8  # concurrent heavy requests before answering 429
+SOLAR_COMPUTE_TIMEOUT = 30.0  # seconds per heavy request before answering 504
+SOLAR_BATCH_MAX_IDS = 200
+SOLAR_BATCH_CHUNK = 16  # objects per process-pool task in batch ephemeris
+SOLAR_NBODY_CHUNK = 32  # particles per process-pool task for ?model=nbody
+SOLAR_NBODY_CACHE_TTL = 86400  # seconds an integrated trajectory stays cached
+
+# Live position push (ws://.../ws/positions/, see solar.live); ASGI only.
+SOLAR_LIVE_MAX_BODIES = 20000
+SOLAR_LIVE_MAX_FPS = 30
+SOLAR_LIVE_MAX_CHANNELS = 8  # distinct (selection, rate, fps) streams computed at once
+SOLAR_LIVE_DELTA_SCALE_AU = 1e-6  # quantum of int16 delta frames
+SOLAR_LIVE_KEYFRAME_EVERY = 100  # ticks between forced keyframes
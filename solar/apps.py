@@ -5,3 +5,10 @@ class SolarConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "solar"
 
+    def ready(self) -> None:
+        from django.db.backends.signals import connection_created
+
+        from .db import apply_sqlite_pragmas, install_query_metrics
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid="solar.apply_sqlite_pragmas")
+        connection_created.connect(install_query_metrics, dispatch_uid="solar.install_query_metrics")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import csv
+import os
+import random
+import time
+from pathlib import Path
+
+# Columns read by import_dataset, in the JPL small-body database CSV layout.
+SYNTHETIC_COLUMNS = ["pdes", "full_name", "neo", "class", "epoch_cal", "e", "a", "i", "om", "w", "ma", "H", "q", "ad", "per_y"]
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ve", "to", "sa", "ne", "di", "po", "lu", "ce", "ar", "gen", "tor", "ix"]
+# class, share of the catalog, a range (AU), e range, i range (deg), H range
+_POPULATIONS = [
+    ("MBA", 0.85, (2.1, 3.3), (0.0, 0.3), (0.0, 25.0), (11.0, 19.0)),
+    ("APO", 0.06, (1.0, 2.6), (0.2, 0.7), (0.0, 30.0), (16.0, 26.0)),
+    ("AMO", 0.04, (1.1, 2.8), (0.1, 0.5), (0.0, 30.0), (15.0, 24.0)),
+    ("TJN", 0.05, (5.0, 5.4), (0.0, 0.2), (0.0, 35.0), (9.0, 16.0)),
+]
+
+
+def db_reader(slot: int, env: dict[str, str], read_db: str, stop, ready, results) -> None:
+    """Spawned-process worker for bench_db; sets Django up itself, against ``env``'s database."""
+    import django
+
+    os.environ.update(env)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "asterviz.settings")
+    django.setup()
+
+    from django.db.models import Q
+
+    from solar.models import SmallBody
+
+    rng = random.Random(slot)
+    qs = SmallBody.objects.using(read_db)
+    latencies: list[float] = []
+    errors = 0
+    ready.put(slot)
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            kind = rng.random()
+            if kind < 0.5:
+                list(qs.filter(Q(name__icontains=str(rng.randint(1, 999)))).order_by("name")[:50])
+            elif kind < 0.8:
+                qs.filter(id__gte=rng.randint(1, 1000)).order_by("id").first()
+            else:
+                qs.filter(category="mainbelt").count()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    results.put((latencies, errors))
+
+
+def synthetic_name(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def write_synthetic_csv(path: Path, count: int, seed: int = 0, first: int = 1) -> None:
+    """A plausible fake catalog that import_dataset can ingest (for offline load tests).
+
+    Designations run ``S<first>`` .. ``S<first + count - 1>``.
+    """
+    rng = random.Random(seed)
+    weights = [p[1] for p in _POPULATIONS]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(SYNTHETIC_COLUMNS)
+        for k in range(first, first + count):
+            cls, _, a_r, e_r, i_r, h_r = rng.choices(_POPULATIONS, weights)[0]
+            a = rng.uniform(*a_r)
+            e = rng.uniform(*e_r)
+            pdes = f"S{k}"
+            writer.writerow(
+                [
+                    pdes,
+                    f"({pdes}) {synthetic_name(rng)}",
+                    "Y" if cls in {"APO", "AMO"} else "N",
+                    cls,
+                    "2025-01-01",
+                    f"{e:.6f}",
+                    f"{a:.6f}",
+                    f"{rng.uniform(*i_r):.4f}",
+                    f"{rng.uniform(0, 360):.4f}",
+                    f"{rng.uniform(0, 360):.4f}",
+                    f"{rng.uniform(0, 360):.4f}",
+                    f"{rng.uniform(*h_r):.2f}",
+                    f"{a * (1 - e):.6f}",
+                    f"{a * (1 + e):.6f}",
+                    f"{a ** 1.5:.6f}",
+                ]
+            )
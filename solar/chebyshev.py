@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .nbody import IntegrationError, integrate_positions
+from .orbits import MU_SUN, OrbitalElements, positions_au, state_vectors
+
+
+@dataclass(frozen=True)
+class Fit:
+    """One body's piecewise fit; ``coeffs`` is (segments, 3, degree + 1)."""
+
+    start_jd: float
+    segment_days: float
+    coeffs: np.ndarray
+    max_error_au: float
+
+    @property
+    def stop_jd(self) -> float:
+        return self.start_jd + self.segment_days * self.coeffs.shape[0]
+
+    def to_bytes(self) -> bytes:
+        return np.ascontiguousarray(self.coeffs, dtype="<f8").tobytes()
+
+
+def from_bytes(raw: bytes, degree: int) -> np.ndarray:
+    return np.frombuffer(bytes(raw), dtype="<f8").reshape(-1, 3, degree + 1)
+
+
+def _nodes(degree: int) -> np.ndarray:
+    n = degree + 1
+    return np.cos(np.pi * (np.arange(n) + 0.5) / n)
+
+
+def _fit_matrix(degree: int) -> np.ndarray:
+    # Discrete Chebyshev transform at first-kind nodes: exact interpolation.
+    n = degree + 1
+    j = np.arange(n)[:, None]
+    k = np.arange(n)[None, :]
+    m = (2.0 / n) * np.cos(np.pi * j * (k + 0.5) / n)
+    m[0] *= 0.5
+    return m
+
+
+def _check_points(degree: int) -> np.ndarray:
+    # Interior points away from the nodes, where interpolation error peaks.
+    return np.linspace(-1.0, 1.0, 2 * (degree + 1) + 1)[1:-1]
+
+
+def clenshaw(coeffs: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    """Evaluate ``coeffs[..., 3, n]`` at ``tau`` (broadcast over leading axes); returns ``[..., 3]``."""
+    b1 = np.zeros(coeffs.shape[:-1])
+    b2 = np.zeros_like(b1)
+    two_tau = 2.0 * tau[..., None]
+    for c in np.moveaxis(coeffs[..., :0:-1], -1, 0):
+        b1, b2 = two_tau * b1 - b2 + c, b1
+    return tau[..., None] * b1 - b2 + coeffs[..., 0]
+
+
+def evaluate(coeffs: np.ndarray, start_jd: float, segment_days: float, times: np.ndarray) -> np.ndarray:
+    """Positions (T, 3) from one body's coefficient block at ``times`` inside its span."""
+    times = np.asarray(times, dtype=float)
+    u = (times - start_jd) / segment_days
+    seg = np.clip(np.floor(u).astype(np.int64), 0, coeffs.shape[0] - 1)
+    tau = 2.0 * (u - seg) - 1.0
+    return clenshaw(coeffs[seg], tau)
+
+
+def _integrate_isolated(pos0: np.ndarray, vel0: np.ndarray, epoch_jd: float, times: list[float]) -> np.ndarray:
+    # Same fallback as nbody.integrate_chunk: a body that breaks the shared
+    # integration is retried alone and comes back as NaN if it fails again.
+    try:
+        return integrate_positions(pos0, vel0, epoch_jd, times)
+    except IntegrationError:
+        if pos0.shape[0] == 1:
+            return np.full((1, len(times), 3), np.nan)
+        return np.concatenate(
+            [_integrate_isolated(pos0[k : k + 1], vel0[k : k + 1], epoch_jd, times) for k in range(pos0.shape[0])]
+        )
+
+
+def sample_model(model: str, items: list[OrbitalElements], times: np.ndarray) -> np.ndarray:
+    """Reference positions (N, T, 3) for ``items`` at ascending ``times``; NaN where n-body integration failed."""
+    el = np.array([[x.a, x.e, x.i_deg, x.Omega_deg, x.omega_deg, x.M0_rad, x.epoch_jd] for x in items])
+    if model == "kepler":
+        # Same units as the two-body ephemeris endpoint (mu=1).
+        return np.stack([positions_au(*el.T, t, mu=1.0) for t in times], axis=1)
+    out = np.empty((len(items), len(times), 3))
+    # The step size is shared per integration and set by the fastest body, so
+    # bodies are grouped by perihelion octave as well as by epoch: a sungrazer
+    # then only slows down other sungrazers.
+    band = np.floor(np.log2(np.maximum(el[:, 0] * (1 - el[:, 1]), 1e-3)))
+    for epoch_jd, q_band in sorted(set(zip(el[:, 6], band))):
+        idx = np.flatnonzero((el[:, 6] == epoch_jd) & (band == q_band))
+        pos0, vel0 = state_vectors(*el[idx, :6].T, el[idx, 6], epoch_jd, mu=MU_SUN)
+        out[idx] = _integrate_isolated(pos0, vel0, float(epoch_jd), list(times))
+    return out
+
+
+def _fit_fixed(
+    model: str, items: list[OrbitalElements], start_jd: float, stop_jd: float, segment_days: float, degree: int
+) -> tuple[np.ndarray, np.ndarray]:
+    nseg = max(1, int(np.ceil((stop_jd - start_jd) / segment_days - 1e-9)))
+    nodes = _nodes(degree)
+    checks = _check_points(degree)
+    local = np.concatenate([nodes, checks])
+    seg_start = start_jd + segment_days * np.arange(nseg)
+    times = (seg_start[:, None] + (local[None, :] + 1.0) * 0.5 * segment_days).ravel()
+    order = np.argsort(times, kind="stable")
+    samples = np.empty((len(items), times.shape[0], 3))
+    samples[:, order] = sample_model(model, items, times[order])
+    samples = samples.reshape(len(items), nseg, local.shape[0], 3)
+
+    n = degree + 1
+    coeffs = np.einsum("jk,bskx->bsxj", _fit_matrix(degree), samples[:, :, :n])
+    approx = clenshaw(coeffs[:, :, None], np.broadcast_to(checks, (len(items), nseg, checks.shape[0])))
+    err = np.linalg.norm(approx - samples[:, :, n:], axis=-1).max(axis=(1, 2))
+    return coeffs, err
+
+
+def fit_bodies(
+    model: str,
+    items: list[OrbitalElements],
+    start_jd: float,
+    stop_jd: float,
+    segment_days: float,
+    degree: int,
+    max_error_au: float,
+    min_segment_days: float = 0.5,
+) -> list[Fit | None]:
+    """Fit every body, shortening its segments until the check error is within ``max_error_au``.
+
+    Segments are halved at least once per retry, and more often when the
+    error is far off: it shrinks roughly like ``seg ** (degree + 1)``.
+    Bodies that still exceed the bound at ``min_segment_days`` keep their
+    best fit; the reported ``max_error_au`` says by how much. Bodies the
+    n-body model cannot integrate get ``None``.
+    """
+    fits: list[Fit | None] = [None] * len(items)
+    pending: dict[float, list[int]] = {float(segment_days): list(range(len(items)))}
+    while pending:
+        seg = max(pending)
+        batch = pending.pop(seg)
+        coeffs, err = _fit_fixed(model, [items[k] for k in batch], start_jd, stop_jd, seg, degree)
+        for row, k in enumerate(batch):
+            if not np.isfinite(err[row]):
+                continue
+            fits[k] = Fit(start_jd, seg, coeffs[row], float(err[row]))
+            if err[row] > max_error_au and seg / 2 >= min_segment_days:
+                halvings = max(1, int(np.ceil(np.log2(err[row] / max_error_au) / (degree + 1))))
+                nxt = seg / 2**halvings
+                while nxt < min_segment_days:
+                    nxt *= 2
+                pending.setdefault(nxt, []).append(k)
+    return fits
+
+
+def fit_chunk(
+    task: tuple[str, list[tuple[int, OrbitalElements]], float, float, float, int, float],
+) -> list[tuple[int, Fit | None]]:
+    """Process-pool task for build_ephemeris; ``None`` marks a body that could not be fitted."""
+    model, items, start_jd, stop_jd, segment_days, degree, max_error_au = task
+    fits = fit_bodies(model, [el for _, el in items], start_jd, stop_jd, segment_days, degree, max_error_au)
+    return [(pk, fit) for (pk, _), fit in zip(items, fits)]
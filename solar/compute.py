@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from django.conf import settings
+from django.db import close_old_connections
+
+T = TypeVar("T")
+
+
+class ComputeBusy(Exception):
+    """Raised when the heavy-request budget is exhausted (maps to HTTP 429)."""
+
+
+class ComputeTimeout(Exception):
+    """Raised when an offloaded computation exceeds its time budget (maps to HTTP 504)."""
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class _Admission:
+    # A plain lock-protected counter rather than an asyncio.Semaphore: under WSGI
+    # every async view gets its own event loop, and asyncio primitives bind to one.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def try_acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self._inflight >= limit:
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+
+_admission = _Admission()
+_pool_lock = threading.Lock()
+_process_pool: ProcessPoolExecutor | None = None
+_thread_pool: ThreadPoolExecutor | None = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            # spawn keeps workers free of the parent's threads and DB connections.
+            _process_pool = ProcessPoolExecutor(
+                max_workers=int(_setting("SOLAR_COMPUTE_PROCESSES", 2)),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(
+                max_workers=int(_setting("SOLAR_COMPUTE_THREADS", 4)),
+                thread_name_prefix="solar-io",
+            )
+        return _thread_pool
+
+
+def _with_db_cleanup(fn: Callable[..., T], *args: Any) -> T:
+    # Pool threads live outside the request cycle, so nothing else
+    # recycles their connections.
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+class HeavySlot:
+    """Admission + deadline for one heavy request.
+
+    Usage::
+
+        async with HeavySlot() as slot:
+            obj = await slot.run_thread(load, id)
+            points = await slot.run_process(propagate, elements, jds)
+
+    Entering raises ``ComputeBusy`` when ``SOLAR_COMPUTE_MAX_INFLIGHT`` heavy
+    requests are already running; any ``run_*`` call raises ``ComputeTimeout``
+    once the request has spent ``SOLAR_COMPUTE_TIMEOUT`` seconds in total.
+
+    The admission slot is held until every task the request submitted has
+    finished, not just until the request returns: work left behind by a
+    timeout still occupies the pools, so it still counts against the limit.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        self.timeout = float(timeout if timeout is not None else _setting("SOLAR_COMPUTE_TIMEOUT", 30.0))
+        self._deadline = 0.0
+        self._held = False
+        self._exited = False
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    async def __aenter__(self) -> "HeavySlot":
+        if not _admission.try_acquire(int(_setting("SOLAR_COMPUTE_MAX_INFLIGHT", 8))):
+            raise ComputeBusy
+        self._held = True
+        self._deadline = asyncio.get_running_loop().time() + self.timeout
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        with self._lock:
+            self._exited = True
+            self._maybe_release()
+
+    def _maybe_release(self) -> None:
+        # Caller holds self._lock.
+        if self._held and self._exited and not self._pending:
+            self._held = False
+            _admission.release()
+
+    def _track(self, future: Future) -> None:
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+
+    def _finished(self, future: Future) -> None:
+        # Runs on a pool thread (or the process pool's manager thread).
+        with self._lock:
+            self._pending.discard(future)
+            self._maybe_release()
+
+    def _submit(self, executor: Executor, fn: Callable[..., T], *args: Any) -> asyncio.Future:
+        future = executor.submit(fn, *args)
+        self._track(future)
+        return asyncio.wrap_future(future)
+
+    def _remaining(self) -> float:
+        remaining = self._deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            raise ComputeTimeout
+        return remaining
+
+    async def _run(self, executor: Executor, fn: Callable[..., T], *args: Any) -> T:
+        remaining = self._remaining()
+        future = self._submit(executor, fn, *args)
+        try:
+            return await asyncio.wait_for(future, remaining)
+        except asyncio.TimeoutError as exc:
+            # wait_for cancels tasks that have not started; one that has keeps
+            # running, and keeps this slot held, until it completes.
+            raise ComputeTimeout from exc
+
+    async def run_thread(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ORM / serialization work on a private thread (not Django's shared sync thread)."""
+        return await self._run(thread_pool(), _with_db_cleanup, fn, *args)
+
+    async def run_process(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run picklable CPU-bound work in the process pool."""
+        return await self._run(process_pool(), fn, *args)
+
+    async def map_process(self, fn: Callable[..., T], chunks: list) -> list[T]:
+        """Fan ``fn`` out over ``chunks`` in the process pool, keeping input order."""
+        remaining = self._remaining()
+        pool = process_pool()
+        futures = [self._submit(pool, fn, chunk) for chunk in chunks]
+        try:
+            return list(await asyncio.wait_for(asyncio.gather(*futures), remaining))
+        except asyncio.TimeoutError as exc:
+            for f in futures:
+                f.cancel()
+            raise ComputeTimeout from exc
+
+
+def inflight() -> int:
+    return _admission.inflight
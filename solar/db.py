@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+
+# Persistent per database file; the read-only alias can neither set nor needs it.
+_WRITE_ONLY_PRAGMAS = {"journal_mode"}
+
+
+def is_read_only(settings_dict: dict) -> bool:
+    return "mode=ro" in str(settings_dict.get("NAME", ""))
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs) -> None:
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    read_only = is_read_only(connection.settings_dict)
+    for name, value in pragmas.items():
+        if read_only and name in _WRITE_ONLY_PRAGMAS:
+            continue
+        connection.connection.execute(f"PRAGMA {name}={value}")
+
+
+class QueryMetrics:
+    """Process-wide query timing, enabled by SOLAR_DB_METRICS (used by the loadtest command).
+
+    ``slow`` counts queries over SOLAR_DB_SLOW_MS, whatever made them slow;
+    ``locked`` counts the ones that ran out the busy timeout. The API reads a
+    read-only connection, which under WAL never waits for the writer, so lock
+    waits are measured in the writer instead (``BlockedTimer``).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.queries = 0
+            self.total_ms = 0.0
+            self.max_ms = 0.0
+            self.slow = 0
+            self.slow_ms = 0.0
+            self.locked = 0
+
+    def record(self, ms: float, locked: bool) -> None:
+        slow_threshold = float(getattr(settings, "SOLAR_DB_SLOW_MS", 50.0))
+        with self._lock:
+            self.queries += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            if ms >= slow_threshold:
+                self.slow += 1
+                self.slow_ms += ms
+            if locked:
+                self.locked += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "total_ms": self.total_ms,
+                "max_ms": self.max_ms,
+                "slow_queries": self.slow,
+                "slow_ms": self.slow_ms,
+                "slow_threshold_ms": float(getattr(settings, "SOLAR_DB_SLOW_MS", 50.0)),
+                "locked_errors": self.locked,
+            }
+
+
+query_metrics = QueryMetrics()
+
+
+class BlockedTimer:
+    """Wall and off-CPU time of one thread's statements, as an execute wrapper.
+
+    SQLite waits for a lock by sleeping in its busy handler, which costs no
+    CPU, so ``blocked_ms`` bounds a writer's lock waits from above (fsync and
+    preemption count too). ``begin``/``end`` time statements the wrapper does
+    not see, such as COMMIT.
+    """
+
+    def __init__(self) -> None:
+        self.wall_ms = 0.0
+        self.blocked_ms = 0.0
+
+    def begin(self) -> tuple[float, float]:
+        return time.perf_counter(), time.thread_time()
+
+    def end(self, mark: tuple[float, float]) -> float:
+        wall_ms = (time.perf_counter() - mark[0]) * 1000.0
+        cpu_ms = (time.thread_time() - mark[1]) * 1000.0
+        self.wall_ms += wall_ms
+        self.blocked_ms += max(0.0, wall_ms - cpu_ms)
+        return wall_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        mark = self.begin()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.end(mark)
+
+
+def _timed_execute(execute, sql, params, many, context):
+    t0 = time.perf_counter()
+    locked = False
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError as exc:
+        locked = "locked" in str(exc)
+        raise
+    finally:
+        query_metrics.record((time.perf_counter() - t0) * 1000.0, locked)
+
+
+def install_query_metrics(sender, connection, **kwargs) -> None:
+    if getattr(settings, "SOLAR_DB_METRICS", False) and _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
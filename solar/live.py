@@ -0,0 +1,326 @@
+"""Live position push over a raw ASGI WebSocket (``/ws/positions/``).
+
+Protocol: after the handshake the client sends one JSON text message::
+
+    {"ids": ["1", "433"]}                       or
+    {"layers": "neo,comet", "limit": 2000},     plus optionally
+    {"rate": 5.0, "fps": 10, "ack": 2}          (simulated days per second, frames per second,
+                                                 frames in flight before waiting for acks)
+
+The server answers with a JSON ``subscribed`` message listing the body ids in
+frame order, then streams binary frames. Every frame starts with
+``FRAME_HEADER``; a keyframe carries float32 xyz per body, a delta frame
+int16 xyz steps of ``scale`` AU relative to the frame numbered ``prev_tick``.
+Positions are in the scene's two-body units (mu=1), like orbitMath.js.
+
+Viewers with the same selection, rate and fps share one ``_Channel``: the
+positions and both encodings are computed once per tick. ``rate`` is rounded
+to three significant digits so near-identical requests share too, and at
+most ``SOLAR_LIVE_MAX_CHANNELS`` channels run at once; beyond that new
+sockets are closed with 1013 (try again later), and 1011 if their channel fails. Each viewer keeps
+only the newest unsent frame, so a slow client skips frames and gets a
+keyframe instead of a delta it could not apply. Transport buffers hide a
+slow reader, so clients that care should opt into acks by sending
+``{"ack": tick}`` for each frame they have drawn.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import struct
+import time
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+from .compute import ComputeBusy, ComputeTimeout, HeavySlot
+from .models import SmallBody
+from .orbits import positions_au
+
+FRAME_MAGIC = b"AVPF"
+FRAME_VERSION = 1
+KIND_KEY = 0
+KIND_DELTA = 1
+# magic, version, kind, reserved, tick, prev_tick, count, jd, scale
+FRAME_HEADER = struct.Struct("<4sBBHIIIdf")
+
+UNIX_EPOCH_JD = 2440587.5
+LAYERS = {"mainbelt", "neo", "trojan", "comet"}
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+class SubscriptionError(ValueError):
+    pass
+
+
+def parse_subscription(raw: str) -> tuple[tuple, int | None]:
+    """Normalize a subscription message into a hashable channel key and the viewer's ack window."""
+    max_bodies = int(_setting("SOLAR_LIVE_MAX_BODIES", 20000))
+    try:
+        msg = json.loads(raw)
+        if not isinstance(msg, dict):
+            raise SubscriptionError("subscription must be a JSON object")
+        rate = float(msg.get("rate", 1.0))
+        fps = int(msg.get("fps", 10))
+        ack = int(msg["ack"]) if msg.get("ack") else None
+        raw_ids = msg.get("ids")
+        if raw_ids is not None and not isinstance(raw_ids, list):
+            raise SubscriptionError("ids must be a list")
+        ids = tuple(sorted({str(x).strip() for x in raw_ids or () if str(x).strip()}))
+        limit = int(msg.get("limit", 5000))
+        layers = tuple(sorted({x.strip() for x in str(msg.get("layers", "")).lower().split(",")} & LAYERS))
+    except SubscriptionError:
+        raise
+    except (TypeError, ValueError, AttributeError, OverflowError) as exc:
+        raise SubscriptionError("subscription fields have the wrong type") from exc
+    if not math.isfinite(rate):
+        raise SubscriptionError("rate must be a finite number")
+    rate = float(f"{rate:.3g}")
+    ack = max(1, ack) if ack is not None else None
+    fps = max(1, min(int(_setting("SOLAR_LIVE_MAX_FPS", 30)), fps))
+    if ids:
+        if len(ids) > max_bodies:
+            raise SubscriptionError(f"at most {max_bodies} ids")
+        return ("ids", ids, rate, fps), ack
+    limit = max(1, min(max_bodies, limit))
+    return ("layers", layers or tuple(sorted(LAYERS)), limit, rate, fps), ack
+
+
+def _load_selection(key: tuple) -> tuple[list[int], np.ndarray]:
+    qs = SmallBody.objects.using(settings.SOLAR_READ_DB).filter(a__gt=0, e__gte=0, e__lt=1)
+    if key[0] == "ids":
+        raw = key[1]
+        numeric = [int(x) for x in raw if x.isdigit()]
+        bodies = list(qs.filter(spkid__in=raw)) + list(qs.filter(pk__in=numeric).exclude(spkid__in=raw))
+        bodies.sort(key=lambda b: b.pk)
+    else:
+        # Deterministic (not random like /api/explore/) so equal requests share a channel.
+        bodies = list(qs.filter(category__in=key[1]).order_by("id")[: key[2]])
+    rows = []
+    for b in bodies:
+        el = b.orbital_elements()
+        rows.append([el.a, el.e, el.i_deg, el.Omega_deg, el.omega_deg, el.M0_rad, el.epoch_jd])
+    return [b.pk for b in bodies], np.asarray(rows, dtype=float).reshape(-1, 7)
+
+
+class _Frame:
+    __slots__ = ("tick", "prev_tick", "key", "delta")
+
+    def __init__(self, tick: int, prev_tick: int, key: bytes, delta: bytes | None) -> None:
+        self.tick = tick
+        self.prev_tick = prev_tick
+        self.key = key
+        self.delta = delta
+
+
+class _Viewer:
+    def __init__(self, ack_window: int | None) -> None:
+        self.pending: _Frame | None = None
+        self.wake = asyncio.Event()
+        self.last_tick = -1
+        self.dropped = 0
+        self.ack_window = ack_window
+        self.unacked: deque[int] = deque()
+        self.room = asyncio.Event()
+        self.closed = False
+
+    def blocked(self) -> bool:
+        return self.ack_window is not None and len(self.unacked) >= self.ack_window
+
+    def ack(self, tick: int) -> None:
+        while self.unacked and self.unacked[0] <= tick:
+            self.unacked.popleft()
+        self.room.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.wake.set()
+        self.room.set()
+
+    def offer(self, frame: _Frame) -> None:
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = frame
+        self.wake.set()
+
+    def take(self) -> bytes:
+        frame = self.pending
+        self.pending = None
+        self.wake.clear()
+        use_delta = frame.delta is not None and self.last_tick == frame.prev_tick
+        self.last_tick = frame.tick
+        if self.ack_window is not None:
+            self.unacked.append(frame.tick)
+        return frame.delta if use_delta else frame.key
+
+
+class _Channel:
+    def __init__(self, key: tuple, ids: list[int], elements: np.ndarray, rate: float, fps: int) -> None:
+        self.key = key
+        self.ids = ids
+        self.elements = elements
+        self.rate = rate
+        self.fps = fps
+        self.viewers: set[_Viewer] = set()
+        self.scale = np.float32(_setting("SOLAR_LIVE_DELTA_SCALE_AU", 1e-6))
+        self.keyframe_every = int(_setting("SOLAR_LIVE_KEYFRAME_EVERY", 100))
+        self.recon: np.ndarray | None = None  # what every client has after the last frame
+        self.task: asyncio.Task | None = None
+
+    def _positions(self, jd: float) -> np.ndarray:
+        if not self.ids:
+            return np.empty((0, 3))
+        return positions_au(*self.elements.T, jd, mu=1.0)
+
+    def _encode(self, tick: int, prev_tick: int, jd: float, pos: np.ndarray) -> _Frame:
+        count = len(self.ids)
+        delta = None
+        if self.recon is not None and tick - prev_tick == 1 and tick % self.keyframe_every:
+            q = np.rint((pos - self.recon) / self.scale)
+            if np.all(np.abs(q) <= 32767):
+                q16 = q.astype("<i2")
+                # Same float32 arithmetic as the JS decoder, so no drift builds up.
+                self.recon = (self.recon + q16.astype(np.float32) * self.scale).astype(np.float32)
+                delta = FRAME_HEADER.pack(
+                    FRAME_MAGIC, FRAME_VERSION, KIND_DELTA, 0, tick, prev_tick, count, jd, float(self.scale)
+                ) + q16.tobytes()
+        if delta is None:
+            self.recon = pos.astype(np.float32)
+        key = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, KIND_KEY, 0, tick, prev_tick, count, jd, 0.0)
+        return _Frame(tick, prev_tick, key + self.recon.astype("<f4").tobytes(), delta)
+
+    async def run(self) -> None:
+        try:
+            await self._run()
+        except Exception:
+            # Without this the task would die quietly and its viewers wait forever.
+            logger.exception("live channel %r failed", self.key[:1] + self.key[-2:])
+            if _channels.get(self.key) is self:
+                del _channels[self.key]
+            for viewer in self.viewers:
+                viewer.close()
+
+    async def _run(self) -> None:
+        t0 = time.monotonic()
+        jd0 = UNIX_EPOCH_JD + time.time() / 86400.0
+        period = 1.0 / self.fps
+        prev_tick = 0
+        tick = 0
+        while self.viewers:
+            jd = jd0 + self.rate * (time.monotonic() - t0)
+            pos = await asyncio.to_thread(self._positions, jd)
+            frame = self._encode(tick, prev_tick, jd, pos)
+            for viewer in self.viewers:
+                viewer.offer(frame)
+            prev_tick = tick
+            # If computing fell behind, skip the missed ticks rather than queueing them.
+            tick = max(tick + 1, int((time.monotonic() - t0) / period) + 1)
+            await asyncio.sleep(max(0.0, t0 + tick * period - time.monotonic()))
+
+
+_channels: dict[tuple, _Channel] = {}
+
+
+def _check_capacity() -> None:
+    if len(_channels) >= int(_setting("SOLAR_LIVE_MAX_CHANNELS", 8)):
+        raise ComputeBusy("too many live channels")
+
+
+async def _join(key: tuple, ack_window: int | None, slot: HeavySlot) -> tuple[_Channel, _Viewer]:
+    channel = _channels.get(key)
+    if channel is None:
+        _check_capacity()
+        ids, elements = await slot.run_thread(_load_selection, key)
+        channel = _channels.get(key)  # another viewer may have created it meanwhile
+        if channel is None:
+            _check_capacity()
+            channel = _Channel(key, ids, elements, rate=key[-2], fps=key[-1])
+            _channels[key] = channel
+    viewer = _Viewer(ack_window)
+    channel.viewers.add(viewer)
+    if channel.task is None or channel.task.done():
+        channel.task = asyncio.create_task(channel.run())
+    return channel, viewer
+
+
+def _leave(channel: _Channel, viewer: _Viewer) -> None:
+    channel.viewers.discard(viewer)
+    if not channel.viewers and _channels.get(channel.key) is channel:
+        del _channels[channel.key]
+
+
+async def _pump(viewer: _Viewer, send) -> None:
+    while True:
+        await viewer.wake.wait()
+        while viewer.blocked() and not viewer.closed:
+            # Frames keep arriving meanwhile and replace each other in viewer.pending.
+            viewer.room.clear()
+            await viewer.room.wait()
+        if viewer.closed:
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        await send({"type": "websocket.send", "bytes": viewer.take()})
+
+
+async def positions_socket(scope, receive, send) -> None:
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    message = await receive()
+    if message["type"] == "websocket.disconnect":
+        return
+    try:
+        key, ack_window = parse_subscription(message.get("text") or "")
+    except SubscriptionError as exc:
+        await send({"type": "websocket.send", "text": json.dumps({"type": "error", "detail": str(exc)})})
+        await send({"type": "websocket.close", "code": 1008})
+        return
+
+    try:
+        async with HeavySlot() as slot:
+            channel, viewer = await _join(key, ack_window, slot)
+    except (ComputeBusy, ComputeTimeout):
+        await send({"type": "websocket.close", "code": 1013})  # try again later
+        return
+
+    pump = None
+    try:
+        await send(
+            {
+                "type": "websocket.send",
+                "text": json.dumps(
+                    {"type": "subscribed", "ids": channel.ids, "rate": channel.rate, "fps": channel.fps}
+                ),
+            }
+        )
+        pump = asyncio.create_task(_pump(viewer, send))
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text"):
+                try:
+                    viewer.ack(int(json.loads(message["text"])["ack"]))
+                except (TypeError, ValueError, KeyError):
+                    pass
+    finally:
+        if pump is not None:
+            pump.cancel()
+        _leave(channel, viewer)
+
+
+async def reject_socket(scope, receive, send) -> None:
+    message = await receive()
+    if message["type"] == "websocket.connect":
+        await send({"type": "websocket.close", "code": 1000})
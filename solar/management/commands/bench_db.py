@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from solar.bench import db_reader, write_synthetic_csv
+
+READER_TIMEOUT_S = 60.0
+
+
+def _exit_codes(procs: list) -> str:
+    return ", ".join(f"reader {k}: {p.exitcode}" for k, p in enumerate(procs))
+
+
+class Command(BaseCommand):
+    help = "Measure API-style read throughput while an import writes concurrently (on a throwaway database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--rows", type=int, default=50000, help="Synthetic rows to import during the run.")
+        parser.add_argument("--catalog", type=int, default=50000, help="Synthetic rows present before the run.")
+        parser.add_argument("--chunk", type=int, default=2000)
+        parser.add_argument("--read-db", type=str, default=None, help="Alias readers use (default: SOLAR_READ_DB).")
+        parser.add_argument(
+            "--db-profile", choices=["dev", "production"], default=None, help="Default: ASTERVIZ_DB_PROFILE."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        readers = max(1, int(opts["readers"]))
+        rows = max(1, int(opts["rows"]))
+        chunk = max(1, int(opts["chunk"]))
+        catalog = max(1, int(opts["catalog"]))
+        read_db = opts["read_db"] or settings.SOLAR_READ_DB
+        profile = opts["db_profile"] or settings.DB_PROFILE
+        manage = str(settings.BASE_DIR / "manage.py")
+
+        self.stdout.write(
+            f"profile={profile} read_db={read_db} readers={readers} catalog={catalog} rows={rows} chunk={chunk}"
+        )
+        # A new file every run, never the configured database: the benchmark
+        # bulk-inserts synthetic bodies, and journal_mode persists in the file,
+        # so a reused one would keep whatever profile last opened it.
+        with tempfile.TemporaryDirectory(prefix="asterviz-bench-") as tmp:
+            catalog_csv = Path(tmp) / "catalog.csv"
+            rows_csv = Path(tmp) / "rows.csv"
+            db_env = {
+                "ASTERVIZ_DB_PATH": str(Path(tmp) / "bench.sqlite3"),
+                "ASTERVIZ_DB_PROFILE": profile,
+                "ASTERVIZ_DB_METRICS": "0",
+            }
+            env = {**os.environ, **db_env}
+            write_synthetic_csv(catalog_csv, catalog, seed=opts["seed"])
+            # New designations, so the measured import inserts like the original benchmark.
+            write_synthetic_csv(rows_csv, rows, seed=opts["seed"] + 1, first=catalog + 1)
+            subprocess.run([sys.executable, manage, "migrate", "--noinput", "-v0"], env=env, check=True)
+            subprocess.run(self._import(manage, catalog_csv, chunk), env=env, check=True, stdout=subprocess.DEVNULL)
+            write_s, all_lat, errors = self._measure(
+                self._import(manage, rows_csv, chunk), env, db_env, read_db, readers
+            )
+
+        all_lat.sort()
+        if not all_lat:
+            self.stderr.write("No reads completed.")
+            return
+        p99 = all_lat[min(len(all_lat) - 1, int(len(all_lat) * 0.99))]
+        self.stdout.write(f"import: {rows} rows in {write_s:.2f}s ({rows / write_s:.0f} rows/s)")
+        self.stdout.write(
+            f"reads: {len(all_lat)} in {write_s:.2f}s ({len(all_lat) / write_s:.0f}/s), errors={errors}"
+        )
+        self.stdout.write(
+            f"read latency ms: p50={statistics.median(all_lat) * 1e3:.2f} "
+            f"p99={p99 * 1e3:.2f} max={all_lat[-1] * 1e3:.2f}"
+        )
+
+    def _import(self, manage: str, csv_path: Path, chunk: int) -> list[str]:
+        return [
+            sys.executable, manage, "import_dataset", "--path", str(csv_path), "--limit", "0", "--chunk", str(chunk)
+        ]
+
+    def _measure(
+        self, importer: list[str], env: dict, db_env: dict, read_db: str, readers: int
+    ) -> tuple[float, list[float], int]:
+        # Readers are separate processes so they contend with the importer on
+        # database locks only, not on the GIL.
+        ctx = multiprocessing.get_context("spawn")
+        stop = ctx.Event()
+        ready = ctx.Queue()
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=db_reader, args=(k, db_env, read_db, stop, ready, results), daemon=True)
+            for k in range(readers)
+        ]
+        for p in procs:
+            p.start()
+        try:
+            try:
+                for _ in procs:
+                    ready.get(timeout=READER_TIMEOUT_S)
+            except queue.Empty:
+                raise CommandError(f"Readers did not start ({_exit_codes(procs)}).") from None
+
+            t0 = time.perf_counter()
+            subprocess.run(importer, env=env, check=True, stdout=subprocess.DEVNULL)
+            write_s = time.perf_counter() - t0
+
+            stop.set()
+            all_lat: list[float] = []
+            errors = 0
+            try:
+                for _ in procs:
+                    lat, err = results.get(timeout=READER_TIMEOUT_S)
+                    all_lat.extend(lat)
+                    errors += err
+            except queue.Empty:
+                raise CommandError(f"Readers did not report ({_exit_codes(procs)}).") from None
+            for p in procs:
+                p.join(timeout=READER_TIMEOUT_S)
+            if any(p.exitcode != 0 for p in procs):
+                raise CommandError(f"A reader failed ({_exit_codes(procs)}).")
+        finally:
+            stop.set()
+            for p in procs:
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+        return write_s, all_lat, errors
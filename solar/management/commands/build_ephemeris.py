@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from solar.chebyshev import Fit, fit_chunk
+from solar.models import ChebyshevEphemeris, SmallBody
+from solar.orbits import OrbitalElements, elements_digest, julian_day_from_date
+
+
+class Command(BaseCommand):
+    help = "Fit piecewise Chebyshev ephemerides; only bodies whose elements or span changed are refit."
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument("--model", choices=[c.value for c in ChebyshevEphemeris.Model], default="kepler")
+        parser.add_argument("--start", type=str, default=(today - timedelta(days=30)).isoformat())
+        parser.add_argument("--stop", type=str, default=(today + timedelta(days=365)).isoformat())
+        parser.add_argument("--segment-days", type=float, default=32.0)
+        parser.add_argument("--degree", type=int, default=10)
+        parser.add_argument(
+            "--max-error",
+            type=float,
+            default=1e-8,
+            help="Error bound in AU; segments are halved per body until it holds.",
+        )
+        parser.add_argument("--chunk", type=int, default=256, help="Bodies per fit task.")
+        parser.add_argument("--workers", type=int, default=0, help="Worker processes; 0 fits in-process.")
+        parser.add_argument("--force", action="store_true", help="Refit every body.")
+        parser.add_argument("--database", type=str, default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **opts):
+        model = opts["model"]
+        start_jd = julian_day_from_date(date.fromisoformat(opts["start"]))
+        stop_jd = julian_day_from_date(date.fromisoformat(opts["stop"]))
+        if stop_jd <= start_jd:
+            raise CommandError("--stop must be after --start")
+        segment_days = float(opts["segment_days"])
+        degree = int(opts["degree"])
+        if segment_days <= 0 or degree < 1:
+            raise CommandError("--segment-days must be > 0 and --degree >= 1")
+        max_error = float(opts["max_error"])
+        chunk = max(1, int(opts["chunk"]))
+        self.database = opts["database"]
+
+        existing = {
+            body_id: (h, s, e, d)
+            for body_id, h, s, e, d in ChebyshevEphemeris.objects.using(self.database)
+            .filter(model=model)
+            .values_list("body_id", "elements_hash", "start_jd", "stop_jd", "degree")
+        }
+        todo: list[tuple[int, OrbitalElements]] = []
+        hashes: dict[int, str] = {}
+        skipped = 0
+        for body in SmallBody.objects.using(self.database).order_by("id").iterator(chunk_size=5000):
+            if not (body.a > 0 and 0 <= body.e < 1):
+                continue
+            elements = body.orbital_elements()
+            digest = elements_digest(elements)
+            prev = existing.get(body.pk)
+            if (
+                not opts["force"]
+                and prev is not None
+                and prev[0] == digest
+                and prev[1] <= start_jd
+                and prev[2] >= stop_jd
+                and prev[3] == degree
+            ):
+                skipped += 1
+                continue
+            hashes[body.pk] = digest
+            todo.append((body.pk, elements))
+
+        self.stdout.write(f"model={model} to_fit={len(todo)} up_to_date={skipped}")
+        tasks = [
+            (model, todo[k : k + chunk], start_jd, stop_jd, segment_days, degree, max_error)
+            for k in range(0, len(todo), chunk)
+        ]
+        errors: list[float] = []
+        unfitted: list[int] = []
+        done = 0
+        if int(opts["workers"]) > 0:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=int(opts["workers"]), mp_context=ctx) as pool:
+                for result in pool.map(fit_chunk, tasks):
+                    unfitted.extend(pk for pk, fit in result if fit is None)
+                    errors.extend(self._store(model, degree, result, hashes))
+                    done += len(result)
+                    self.stdout.write(f"... fitted {done}/{len(todo)}")
+        else:
+            for task in tasks:
+                result = fit_chunk(task)
+                unfitted.extend(pk for pk, fit in result if fit is None)
+                errors.extend(self._store(model, degree, result, hashes))
+                done += len(result)
+                self.stdout.write(f"... fitted {done}/{len(todo)}")
+
+        if unfitted:
+            shown = ", ".join(str(pk) for pk in unfitted[:20]) + (" ..." if len(unfitted) > 20 else "")
+            self.stdout.write(self.style.WARNING(f"{len(unfitted)} bodies could not be integrated: {shown}"))
+        if not errors:
+            self.stdout.write(self.style.SUCCESS("Nothing to fit."))
+            return
+        err = np.asarray(errors)
+        over = int(np.count_nonzero(err > max_error))
+        self.stdout.write(
+            f"fit error AU: max={err.max():.3e} p99={np.quantile(err, 0.99):.3e} median={np.median(err):.3e}"
+        )
+        if over:
+            self.stdout.write(self.style.WARNING(f"{over} bodies exceed --max-error even at the minimum segment length"))
+        self.stdout.write(self.style.SUCCESS(f"Done. fitted={len(errors)} unfitted={len(unfitted)} skipped={skipped}"))
+
+    def _store(
+        self, model: str, degree: int, result: list[tuple[int, Fit | None]], hashes: dict[int, str]
+    ) -> list[float]:
+        result = [(pk, fit) for pk, fit in result if fit is not None]
+        rows = [
+            ChebyshevEphemeris(
+                body_id=pk,
+                model=model,
+                start_jd=fit.start_jd,
+                stop_jd=fit.stop_jd,
+                segment_days=fit.segment_days,
+                degree=degree,
+                coeffs=fit.to_bytes(),
+                max_error_au=fit.max_error_au,
+                elements_hash=hashes[pk],
+            )
+            for pk, fit in result
+        ]
+        objects = ChebyshevEphemeris.objects.using(self.database)
+        with transaction.atomic(using=self.database):
+            objects.filter(model=model, body_id__in=[pk for pk, _ in result]).delete()
+            objects.bulk_create(rows)
+        return [fit.max_error_au for _, fit in result]
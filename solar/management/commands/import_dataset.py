@@ -2,18 +2,25 @@ from __future__ import annotations
 
 import csv
 import hashlib
+import json
 import math
+import time
 from dataclasses import dataclass
 from datetime import date
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.utils import timezone
 
+from solar.db import BlockedTimer
 from solar.models import SmallBody
+from solar.orbits import julian_day_from_date
 
 
 DATASET_DEFAULT = Path(r"D:\MAN\dataset\dataset_3\dataset.csv")
+# Batches retried after SQLite's busy timeout runs out before the import gives up.
+LOCKED_RETRIES = 3
 
 
 def _float(v: str | None) -> float | None:
@@ -41,11 +48,26 @@ def _category_from_row(row: dict[str, str]) -> str:
 
 
 def _deterministic_m0(spkid: str) -> float:
+    # Placeholder phase for datasets without a mean anomaly column; such rows
+    # are stored with M0_known=False and are kept out of real-sky results.
     h = hashlib.sha256(spkid.encode("utf-8")).digest()
     u = int.from_bytes(h[:8], "big") / 2**64
     return float(u * 2 * math.pi)
 
 
+def _mean_anomaly(row: dict[str, str], a: float, epoch: date) -> float | None:
+    """JPL ``ma`` (deg at the ``epoch`` JD) as radians at 0h UTC of ``epoch``, which is what is stored."""
+    ma = _float(row.get("ma"))
+    if ma is None or a <= 0:
+        return None
+    epoch_jd = _float(row.get("epoch"))
+    if epoch_jd is not None:
+        # Gaussian mean motion in deg/day; JPL epochs are nearly always 0h TDB already.
+        n_deg_day = math.degrees(0.01720209895) / a**1.5
+        ma += n_deg_day * (julian_day_from_date(epoch) - epoch_jd)
+    return math.radians(ma % 360.0)
+
+
 @dataclass(frozen=True)
 class _Parsed:
     name: str
@@ -62,6 +84,7 @@ class _Parsed:
     omega: float
     period_days: float | None
     M0: float
+    M0_known: bool
 
 
 def _parse_row(row: dict[str, str]) -> _Parsed | None:
@@ -95,6 +118,7 @@ def _parse_row(row: dict[str, str]) -> _Parsed | None:
     period_days = per_y * 365.25 if per_y is not None else None
 
     category = _category_from_row(row)
+    M0 = _mean_anomaly(row, float(a), epoch)
     return _Parsed(
         name=name,
         spkid=spkid,
@@ -109,7 +133,8 @@ def _parse_row(row: dict[str, str]) -> _Parsed | None:
         Omega=float(Omega),
         omega=float(omega),
         period_days=period_days,
-        M0=_deterministic_m0(spkid),
+        M0=M0 if M0 is not None else _deterministic_m0(spkid),
+        M0_known=M0 is not None,
     )
 
 
@@ -121,12 +146,18 @@ class Command(BaseCommand):
         parser.add_argument("--limit", type=int, default=20000, help="Max rows to import; use 0 for no limit.")
         parser.add_argument("--offset", type=int, default=0)
         parser.add_argument("--chunk", type=int, default=2000)
+        parser.add_argument("--database", type=str, default=DEFAULT_DB_ALIAS, help="Alias to write through.")
+        parser.add_argument(
+            "--stats-file", type=str, default=None, help="Append per-batch timings as JSON lines (loadtest --writer)."
+        )
 
     def handle(self, *args, **opts):
         path = Path(opts["path"])
         limit = int(opts["limit"])
         offset = int(opts["offset"])
         chunk = int(opts["chunk"])
+        self.database = opts["database"]
+        self.stats_file = Path(opts["stats_file"]) if opts["stats_file"] else None
         if not path.exists():
             self.stderr.write(f"Dataset not found: {path}")
             return
@@ -164,6 +195,7 @@ class Command(BaseCommand):
                     Omega_node=parsed.Omega,
                     omega=parsed.omega,
                     M0=parsed.M0,
+                    M0_known=parsed.M0_known,
                     epoch=parsed.epoch,
                     H=parsed.H,
                     q_peri=parsed.q,
@@ -188,12 +220,48 @@ class Command(BaseCommand):
             updated += u
         self.stdout.write(self.style.SUCCESS(f"Done. created={created} updated={updated}"))
 
-    @transaction.atomic
     def _flush(self, batch: list[SmallBody]) -> tuple[int, int]:
+        # The writer is where SQLite lock waits happen: in the busy handler,
+        # during writes and COMMIT (with a rollback journal, until readers let
+        # go). Batches that run out the busy timeout are retried.
+        timer = BlockedTimer()
+        retries = 0
+        locked_ms = 0.0
+        with connections[self.database].execute_wrapper(timer):
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    with transaction.atomic(using=self.database):
+                        result = self._flush_batch(batch)
+                        commit = timer.begin()
+                    commit_ms = timer.end(commit)
+                    break
+                except OperationalError as exc:
+                    if "locked" not in str(exc) or retries >= LOCKED_RETRIES:
+                        raise
+                    retries += 1
+                    locked_ms += (time.perf_counter() - t0) * 1000.0
+        if self.stats_file is not None:
+            stats = {
+                "rows": len(batch),
+                "batch_ms": (time.perf_counter() - t0) * 1000.0,
+                "sql_ms": timer.wall_ms,
+                "blocked_ms": timer.blocked_ms,
+                "commit_ms": commit_ms,
+                "locked_retries": retries,
+                "locked_ms": locked_ms,
+            }
+            with self.stats_file.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(stats) + "\n")
+        return result
+
+    def _flush_batch(self, batch: list[SmallBody]) -> tuple[int, int]:
+        objects = SmallBody.objects.using(self.database)
         spkids = [b.spkid for b in batch]
-        existing = {o.spkid: o for o in SmallBody.objects.filter(spkid__in=spkids)}
+        existing = {o.spkid: o for o in objects.filter(spkid__in=spkids)}
         to_create: list[SmallBody] = []
         to_update: list[SmallBody] = []
+        now = timezone.now()
         for b in batch:
             ex = existing.get(b.spkid)
             if not ex:
@@ -207,18 +275,36 @@ class Command(BaseCommand):
             ex.Omega_node = b.Omega_node
             ex.omega = b.omega
             ex.M0 = b.M0
+            ex.M0_known = b.M0_known
             ex.epoch = b.epoch
             ex.H = b.H
             ex.q_peri = b.q_peri
             ex.Q_aph = b.Q_aph
             ex.period = b.period
+            ex.updated_at = now
             to_update.append(ex)
 
         if to_create:
-            SmallBody.objects.bulk_create(to_create, ignore_conflicts=True)
+            objects.bulk_create(to_create, ignore_conflicts=True)
         if to_update:
-            SmallBody.objects.bulk_update(
+            objects.bulk_update(
                 to_update,
-                ["name", "category", "a", "e", "i", "Omega_node", "omega", "M0", "epoch", "H", "q_peri", "Q_aph", "period"],
+                [
+                    "name",
+                    "category",
+                    "a",
+                    "e",
+                    "i",
+                    "Omega_node",
+                    "omega",
+                    "M0",
+                    "M0_known",
+                    "epoch",
+                    "H",
+                    "q_peri",
+                    "Q_aph",
+                    "period",
+                    "updated_at",
+                ],
             )
         return (len(to_create), len(to_update))
@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from solar.bench import synthetic_name, write_synthetic_csv
+
+DEFAULT_MIX = "explore=1,random=3,search=8,object=4,ephemeris=2"
+SCENARIOS = ("explore", "random", "search", "object", "ephemeris", "ephemeris_nbody", "sky", "stats")
+CATEGORIES = ("any", "neo", "mainbelt", "trojan", "comet")
+
+
+def _parse_mix(raw: str) -> dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise CommandError("--mix needs at least one positive weight")
+    return mix
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.active = False
+        self.samples: list[tuple[str, int, float]] = []  # label, status (0 = transport error), seconds
+
+    def add(self, label: str, status: int, seconds: float) -> None:
+        if self.active:
+            with self._lock:
+                self.samples.append((label, status, seconds))
+
+
+class _Client:
+    """One simulated user: a keep-alive connection replaying the scenario mix."""
+
+    def __init__(self, port: int, mix: dict[str, float], total: int, seed: int, think: float, rec: _Recorder) -> None:
+        self.port = port
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.total = max(1, total)
+        self.rng = random.Random(seed)
+        self.think = think
+        self.rec = rec
+        self.conn: http.client.HTTPConnection | None = None
+
+    def _get(self, label: str, path: str) -> None:
+        t0 = time.perf_counter()
+        status = 0
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            self.conn.request("GET", path, headers={"Accept": "application/json"})
+            resp = self.conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        self.rec.add(label, status, time.perf_counter() - t0)
+
+    def _window(self) -> str:
+        start = datetime(2025, 1, 1) + (datetime(2026, 1, 1) - datetime(2025, 1, 1)) * self.rng.random()
+        days = self.rng.choice([30, 90, 180, 365])
+        stop = start.toordinal() + days
+        return f"start={start.date().isoformat()}&stop={datetime.fromordinal(stop).date().isoformat()}"
+
+    def step(self) -> None:
+        rng = self.rng
+        scenario = rng.choices(self.names, self.weights)[0]
+        if scenario == "search":
+            # Search-as-you-type: one request per keystroke after the second.
+            name = synthetic_name(rng)
+            for n in range(2, min(len(name), rng.randint(3, 7)) + 1):
+                self._get("search", f"/api/search/?q={name[:n]}")
+                time.sleep(self.think)
+        elif scenario == "explore":
+            limit = rng.choice([500, 2000, 5000])
+            self._get("explore", f"/api/explore/?limit={limit}&layers=mainbelt,neo,trojan,comet")
+        elif scenario == "random":
+            self._get("random", f"/api/random/?category={rng.choice(CATEGORIES)}")
+        elif scenario == "object":
+            self._get("object", f"/api/object/{rng.randint(1, self.total)}/")
+        elif scenario == "ephemeris":
+            self._get("ephemeris", f"/api/object/{rng.randint(1, self.total)}/ephemeris/?{self._window()}&step=1d")
+        elif scenario == "ephemeris_nbody":
+            self._get(
+                "ephemeris_nbody",
+                f"/api/object/{rng.randint(1, self.total)}/ephemeris/?{self._window()}&step=2d&model=nbody",
+            )
+        elif scenario == "sky":
+            self._get("sky", f"/api/sky/?mag_limit={rng.choice([10, 14, 18])}&limit=100")
+        else:
+            self._get("stats", "/api/stats/")
+        time.sleep(self.think)
+
+    def run(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self.step()
+        if self.conn is not None:
+            self.conn.close()
+
+
+class Command(BaseCommand):
+    help = "Start the project on localhost against a synthetic catalog and replay an API load mix."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bodies", type=int, default=50000, help="Synthetic catalog size.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Simulated users.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds.")
+        parser.add_argument("--warmup", type=float, default=5.0)
+        parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help=f"Weights; scenarios: {', '.join(SCENARIOS)}")
+        parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between user actions.")
+        parser.add_argument("--server", choices=["uvicorn", "runserver"], default="uvicorn")
+        parser.add_argument(
+            "--workers", type=int, default=1, help="uvicorn worker processes; DB metrics need a single one."
+        )
+        parser.add_argument("--db-profile", choices=["dev", "production"], default="production")
+        parser.add_argument("--writer", action="store_true", help="Re-import the catalog during the run.")
+        parser.add_argument("--out", type=str, default=str(settings.BASE_DIR / "loadtest_results"))
+        parser.add_argument("--fresh", action="store_true", help="Rebuild the synthetic database.")
+        parser.add_argument("--compare", type=str, default=None, help="Earlier result JSON to diff against.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        mix = _parse_mix(opts["mix"])
+        out = Path(opts["out"])
+        out.mkdir(parents=True, exist_ok=True)
+        bodies = max(1, int(opts["bodies"]))
+        workers = max(1, int(opts["workers"]))
+        manage = str(settings.BASE_DIR / "manage.py")
+        # /api/_metrics/ counts per process; with several workers each call
+        # reaches an arbitrary one, so the numbers would describe one worker.
+        db_metrics = opts["server"] == "runserver" or workers == 1
+        if not db_metrics:
+            self.stdout.write(self.style.WARNING("DB metrics are per process; not collected with --workers > 1."))
+
+        csv_path = out / f"synthetic_{bodies}.csv"
+        db_path = out / f"loadtest_{bodies}.sqlite3"
+        env = {
+            **os.environ,
+            "ASTERVIZ_DB_PATH": str(db_path),
+            "ASTERVIZ_DB_PROFILE": opts["db_profile"],
+            "ASTERVIZ_DB_METRICS": "1" if db_metrics else "0",
+        }
+        if opts["fresh"] or not db_path.exists():
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+            self.stdout.write(f"Building synthetic catalog ({bodies} bodies) at {db_path}")
+            write_synthetic_csv(csv_path, bodies, seed=opts["seed"])
+            subprocess.run([sys.executable, manage, "migrate", "--noinput", "-v0"], env=env, check=True)
+            subprocess.run(
+                [sys.executable, manage, "import_dataset", "--path", str(csv_path), "--limit", "0", "--chunk", "5000"],
+                env=env,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+
+        port = _free_port()
+        if opts["server"] == "uvicorn":
+            cmd = [
+                sys.executable, "-m", "uvicorn", "asterviz.asgi:application",
+                "--host", "127.0.0.1", "--port", str(port),
+                "--workers", str(workers),
+                "--no-access-log", "--log-level", "warning",
+            ]
+        else:
+            cmd = [sys.executable, manage, "runserver", f"127.0.0.1:{port}", "--noreload"]
+        log_path = out / "server.log"
+        with log_path.open("w", encoding="utf-8") as log:
+            server = subprocess.Popen(cmd, env=env, cwd=str(settings.BASE_DIR), stdout=log, stderr=subprocess.STDOUT)
+        writer = None
+        writer_stats = out / "writer_stats.jsonl"
+        writer_stats.unlink(missing_ok=True)
+        db = None
+        try:
+            total = self._wait_ready(port, server, log_path)
+            self.stdout.write(
+                f"{opts['server']} on :{port}, catalog={total}, concurrency={opts['concurrency']}, mix={mix}"
+            )
+            rec = _Recorder()
+            stop = threading.Event()
+            think = float(opts["think_ms"]) / 1000.0
+            clients = [
+                _Client(port, mix, total, opts["seed"] * 1000 + k, think, rec)
+                for k in range(max(1, int(opts["concurrency"])))
+            ]
+            threads = [threading.Thread(target=c.run, args=(stop,), daemon=True) for c in clients]
+            for t in threads:
+                t.start()
+
+            time.sleep(max(0.0, float(opts["warmup"])))
+            if db_metrics:
+                self._fetch_json(port, "/api/_metrics/?reset=1")
+            if opts["writer"]:
+                writer = self._start_writer(manage, csv_path, writer_stats, env)
+            rec.active = True
+            t0 = time.perf_counter()
+            time.sleep(max(0.1, float(opts["duration"])))
+            rec.active = False
+            elapsed = time.perf_counter() - t0
+            if db_metrics:
+                db = self._fetch_json(port, "/api/_metrics/")
+            stop.set()
+            for t in threads:
+                t.join(timeout=65)
+        finally:
+            if writer is not None:
+                self._stop_writer(writer)
+            server.terminate()
+            try:
+                server.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+        report = self._report(rec.samples, elapsed)
+        result = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "commit": self._git_commit(),
+            "config": {
+                "bodies": total,
+                "concurrency": int(opts["concurrency"]),
+                "duration_s": elapsed,
+                "warmup_s": float(opts["warmup"]),
+                "mix": mix,
+                "think_ms": float(opts["think_ms"]),
+                "server": opts["server"],
+                "workers": workers,
+                "db_profile": opts["db_profile"],
+                "writer": bool(opts["writer"]),
+            },
+            **report,
+            "db": db,
+            "writer": self._writer_report(writer_stats) if opts["writer"] else None,
+        }
+        path = out / f"run_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.json"
+        path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        self._print(result)
+        self.stdout.write(self.style.SUCCESS(f"Saved {path}"))
+        if opts["compare"]:
+            self._print_compare(json.loads(Path(opts["compare"]).read_text(encoding="utf-8")), result)
+
+    def _fetch_json(self, port: int, path: str) -> dict:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        try:
+            conn.request("GET", path, headers={"Accept": "application/json"})
+            resp = conn.getresponse()
+            body = resp.read()
+            if resp.status != 200:
+                raise CommandError(f"GET {path} -> {resp.status}")
+            return json.loads(body)
+        finally:
+            conn.close()
+
+    def _wait_ready(self, port: int, server: subprocess.Popen, log_path: Path) -> int:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited early; see {log_path}")
+            try:
+                return int(self._fetch_json(port, "/api/stats/")["total"])
+            except (OSError, CommandError, http.client.HTTPException):
+                time.sleep(0.25)
+        raise CommandError(f"Server did not become ready; see {log_path}")
+
+    def _start_writer(self, manage: str, csv_path: Path, stats_path: Path, env: dict) -> subprocess.Popen:
+        # Re-importing updates every row in place: realistic write pressure.
+        loop = (
+            "import subprocess, sys\n"
+            "while True:\n"
+            f"    subprocess.run([sys.executable, {manage!r}, 'import_dataset', '--path', {str(csv_path)!r},"
+            f" '--limit', '0', '--chunk', '5000', '--stats-file', {str(stats_path)!r}], stdout=subprocess.DEVNULL)\n"
+        )
+        # Own process group, so stopping it also stops an import that is mid-run.
+        if os.name == "posix":
+            return subprocess.Popen([sys.executable, "-c", loop], env=env, start_new_session=True)
+        return subprocess.Popen(
+            [sys.executable, "-c", loop], env=env, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
+        )
+
+    def _stop_writer(self, writer: subprocess.Popen) -> None:
+        if os.name == "posix":
+            try:
+                os.killpg(writer.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        else:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(writer.pid)], capture_output=True)
+        writer.wait()
+
+    def _writer_report(self, stats_path: Path) -> dict:
+        batches = []
+        if stats_path.exists():
+            for line in stats_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    batches.append(json.loads(line))
+                except ValueError:
+                    pass  # the last line of a batch cut off by _stop_writer
+        commit = sorted(b["commit_ms"] for b in batches)
+        return {
+            "batches": len(batches),
+            "rows": sum(b["rows"] for b in batches),
+            "batch_ms": sum(b["batch_ms"] for b in batches),
+            "sql_ms": sum(b["sql_ms"] for b in batches),
+            "blocked_ms": sum(b["blocked_ms"] for b in batches),
+            "commit_ms": {
+                "total": sum(commit),
+                "p50": _percentile(commit, 0.50),
+                "max": commit[-1] if commit else 0.0,
+            },
+            "locked_retries": sum(b["locked_retries"] for b in batches),
+            "locked_ms": sum(b["locked_ms"] for b in batches),
+        }
+
+    def _git_commit(self) -> str | None:
+        try:
+            res = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=10
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return res.stdout.strip() or None
+
+    def _summarize(self, samples: list[tuple[int, float]], elapsed: float) -> dict:
+        lat = sorted(s for _, s in samples)
+        errors = sum(1 for status, _ in samples if not 200 <= status < 300)
+        statuses: dict[str, int] = {}
+        for status, _ in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(samples),
+            "rps": len(samples) / elapsed if elapsed else 0.0,
+            "error_rate": errors / len(samples) if samples else 0.0,
+            "statuses": statuses,
+            "latency_ms": {
+                "p50": _percentile(lat, 0.50) * 1e3,
+                "p90": _percentile(lat, 0.90) * 1e3,
+                "p99": _percentile(lat, 0.99) * 1e3,
+                "max": (lat[-1] if lat else 0.0) * 1e3,
+            },
+        }
+
+    def _report(self, samples: list[tuple[str, int, float]], elapsed: float) -> dict:
+        by_label: dict[str, list[tuple[int, float]]] = {}
+        for label, status, seconds in samples:
+            by_label.setdefault(label, []).append((status, seconds))
+        return {
+            "totals": self._summarize([(st, s) for _, st, s in samples], elapsed),
+            "endpoints": {label: self._summarize(rows, elapsed) for label, rows in sorted(by_label.items())},
+        }
+
+    def _print(self, result: dict) -> None:
+        self.stdout.write(f"{'endpoint':<16}{'req':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+        rows = [*result["endpoints"].items(), ("TOTAL", result["totals"])]
+        for label, s in rows:
+            lat = s["latency_ms"]
+            self.stdout.write(
+                f"{label:<16}{s['requests']:>8}{s['rps']:>9.1f}{s['error_rate'] * 100:>7.2f}"
+                f"{lat['p50']:>9.1f}{lat['p90']:>9.1f}{lat['p99']:>9.1f}{lat['max']:>9.1f}"
+            )
+        db = result["db"]
+        if db is None:
+            self.stdout.write("db: not collected (--workers > 1)")
+        else:
+            self.stdout.write(
+                f"db: queries={db['queries']} slow_queries(>={db['slow_threshold_ms']:.0f}ms)={db['slow_queries']} "
+                f"slow_ms={db['slow_ms']:.0f} max_ms={db['max_ms']:.1f} locked_errors={db['locked_errors']}"
+            )
+        w = result.get("writer")
+        if w is not None:
+            self.stdout.write(
+                f"writer: batches={w['batches']} rows={w['rows']} batch_ms={w['batch_ms']:.0f} "
+                f"sql_ms={w['sql_ms']:.0f} blocked_ms={w['blocked_ms']:.0f} "
+                f"commit_ms={w['commit_ms']['total']:.0f} (p50={w['commit_ms']['p50']:.1f} "
+                f"max={w['commit_ms']['max']:.1f}) "
+                f"locked_retries={w['locked_retries']} locked_ms={w['locked_ms']:.0f}"
+            )
+
+    def _print_compare(self, before: dict, after: dict) -> None:
+        self.stdout.write(f"vs {before.get('finished_at')} ({before.get('commit')}):")
+        self.stdout.write(f"{'endpoint':<16}{'rps':>18}{'p99 ms':>22}{'err%':>16}")
+        labels = sorted(set(before["endpoints"]) | set(after["endpoints"])) + ["TOTAL"]
+        for label in labels:
+            b = before["totals"] if label == "TOTAL" else before["endpoints"].get(label)
+            a = after["totals"] if label == "TOTAL" else after["endpoints"].get(label)
+            if not a or not b:
+                self.stdout.write(f"{label:<16}  (only in {'new' if a else 'old'} run)")
+                continue
+            self.stdout.write(
+                f"{label:<16}{b['rps']:>8.1f} -> {a['rps']:<7.1f}"
+                f"{b['latency_ms']['p99']:>10.1f} -> {a['latency_ms']['p99']:<8.1f}"
+                f"{b['error_rate'] * 100:>6.2f} -> {a['error_rate'] * 100:<6.2f}"
+            )
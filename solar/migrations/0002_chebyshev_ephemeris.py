@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("solar", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChebyshevEphemeris",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("model", models.CharField(choices=[("kepler", "Two-body"), ("nbody", "N-body")], max_length=16)),
+                ("start_jd", models.FloatField()),
+                ("stop_jd", models.FloatField()),
+                ("segment_days", models.FloatField()),
+                ("degree", models.PositiveSmallIntegerField()),
+                ("coeffs", models.BinaryField()),
+                ("max_error_au", models.FloatField(help_text="Largest deviation from the source model at check points (AU)")),
+                ("elements_hash", models.CharField(max_length=40)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("body", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="chebyshev", to="solar.smallbody")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("body", "model"), name="uniq_chebyshev_body_model")],
+            },
+        )
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("solar", "0002_chebyshev_ephemeris"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="smallbody",
+            name="M0_known",
+            field=models.BooleanField(
+                default=False, help_text="M0 is the dataset's mean anomaly; otherwise a placeholder phase"
+            ),
+        )
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from .orbits import OrbitalElements, julian_day_from_date
+
 
 class SmallBody(models.Model):
     class Category(models.TextChoices):
@@ -19,6 +21,9 @@ class SmallBody(models.Model):
     Omega_node = models.FloatField(help_text="Longitude of ascending node Ω (deg)")
     omega = models.FloatField(help_text="Argument of periapsis ω (deg)")
     M0 = models.FloatField(help_text="Mean anomaly at epoch M0 (rad)")
+    M0_known = models.BooleanField(
+        default=False, help_text="M0 is the dataset's mean anomaly; otherwise a placeholder phase"
+    )
     epoch = models.DateField(help_text="Epoch date (UTC)")
 
     H = models.FloatField(null=True, blank=True, help_text="Absolute magnitude H")
@@ -27,6 +32,48 @@ class SmallBody(models.Model):
     period = models.FloatField(null=True, blank=True, help_text="Orbital period (days)")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # bulk_update skips auto_now, so import_dataset sets this explicitly.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return f"{self.name} ({self.spkid})"
+
+    def orbital_elements(self) -> OrbitalElements:
+        return OrbitalElements(
+            a=self.a,
+            e=self.e,
+            i_deg=self.i,
+            Omega_deg=self.Omega_node,
+            omega_deg=self.omega,
+            M0_rad=self.M0,
+            epoch_jd=julian_day_from_date(self.epoch),
+        )
+
+
+class ChebyshevEphemeris(models.Model):
+    """Piecewise Chebyshev fit of one body's heliocentric position (see solar.chebyshev).
+
+    ``coeffs`` holds float64 values shaped (segments, 3, degree + 1). The fit
+    is only valid while ``elements_hash`` matches the body's current elements.
+    """
+
+    class Model(models.TextChoices):
+        KEPLER = "kepler", "Two-body"
+        NBODY = "nbody", "N-body"
+
+    body = models.ForeignKey(SmallBody, on_delete=models.CASCADE, related_name="chebyshev")
+    model = models.CharField(max_length=16, choices=Model.choices)
+    start_jd = models.FloatField()
+    stop_jd = models.FloatField()
+    segment_days = models.FloatField()
+    degree = models.PositiveSmallIntegerField()
+    coeffs = models.BinaryField()
+    max_error_au = models.FloatField(help_text="Largest deviation from the source model at check points (AU)")
+    elements_hash = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["body", "model"], name="uniq_chebyshev_body_model")]
+
+    def __str__(self) -> str:
+        return f"{self.body_id} {self.model} [{self.start_jd}, {self.stop_jd}]"
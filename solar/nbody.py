@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .orbits import MU_SUN, OrbitalElements, elements_digest, is_bound, state_vectors
+from .planets import PLANET_GM_DAY, planet_positions_au
+
+GM_SUN_DAY = MU_SUN / 365.25**2  # AU^3 / day^2
+
+# Dormand-Prince 5(4) tableau.
+_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0])
+_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+_B5 = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+_B4 = np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+_E = _B5 - _B4
+
+
+class IntegrationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Tolerances:
+    rtol: float = 1e-10
+    atol: float = 1e-12  # AU and AU/day
+    max_step_days: float = 16.0
+    max_steps: int = 200_000
+
+
+def acceleration(t_jd: float, pos: np.ndarray, perturbers: bool = True) -> np.ndarray:
+    """Heliocentric acceleration (AU/day^2) of massless particles, (N, 3) -> (N, 3)."""
+    r3 = np.sum(pos * pos, axis=1) ** 1.5
+    acc = -GM_SUN_DAY * pos / r3[:, None]
+    if not perturbers:
+        return acc
+    planets = planet_positions_au(t_jd)
+    # Direct pull of each planet plus the indirect term from the Sun's
+    # reflex motion, since the frame is heliocentric.
+    diff = planets[None, :, :] - pos[:, None, :]
+    d3 = np.sum(diff * diff, axis=2) ** 1.5
+    direct = np.einsum("p,npk->nk", PLANET_GM_DAY, diff / d3[:, :, None])
+    indirect = (PLANET_GM_DAY[:, None] * planets / (np.sum(planets * planets, axis=1) ** 1.5)[:, None]).sum(axis=0)
+    return acc + direct - indirect
+
+
+def _derivative(t_jd: float, y: np.ndarray, perturbers: bool) -> np.ndarray:
+    out = np.empty_like(y)
+    out[:, :3] = y[:, 3:]
+    out[:, 3:] = acceleration(t_jd, y[:, :3], perturbers)
+    return out
+
+
+def _integrate_one_way(
+    y: np.ndarray, t0: float, targets: list[float], tol: Tolerances, perturbers: bool
+) -> list[np.ndarray]:
+    """Advance ``y`` from ``t0`` through monotone ``targets``; returns positions at each target."""
+    out: list[np.ndarray] = []
+    if not targets:
+        return out
+    direction = 1.0 if targets[-1] >= t0 else -1.0
+    t = t0
+    h = direction * min(1.0, tol.max_step_days)
+    k1 = _derivative(t, y, perturbers)
+    steps = 0
+    for target in targets:
+        while direction * (target - t) > 1e-9:
+            steps += 1
+            if steps > tol.max_steps:
+                raise IntegrationError("n-body integration exceeded max_steps")
+            h = direction * min(abs(h), tol.max_step_days, abs(target - t))
+            ks = [k1]
+            for s in range(1, 7):
+                ys = y + h * sum(a * k for a, k in zip(_A[s], ks) if a)
+                ks.append(_derivative(t + _C[s] * h, ys, perturbers))
+            y_new = y + h * sum(b * k for b, k in zip(_B5, ks) if b)
+            err = h * sum(c * k for c, k in zip(_E, ks) if c)
+            scale = tol.atol + tol.rtol * np.maximum(np.abs(y), np.abs(y_new))
+            # One step size for the whole batch: the worst particle decides.
+            err_norm = float(np.max(np.sqrt(np.mean((err / scale) ** 2, axis=1))))
+            if not np.isfinite(err_norm):
+                # Shrinking h cannot fix a NaN state; it would only spin until max_steps.
+                raise IntegrationError(f"n-body state became non-finite near JD {t:.1f}")
+            if err_norm <= 1.0:
+                t += h
+                y = y_new
+                k1 = ks[6]  # first-same-as-last
+            factor = 5.0 if err_norm == 0 else min(5.0, max(0.2, 0.9 * err_norm ** -0.2))
+            h *= factor
+        out.append(y[:, :3].copy())
+    return out
+
+
+def integrate_positions(
+    pos0: np.ndarray,
+    vel0: np.ndarray,
+    t0: float,
+    times: list[float],
+    tol: Tolerances = Tolerances(),
+    perturbers: bool = True,
+) -> np.ndarray:
+    """Integrate particles from a shared epoch ``t0``; returns (N, len(times), 3) positions.
+
+    ``times`` must be ascending; samples before ``t0`` are reached by
+    integrating backwards from the epoch.
+    """
+    y0 = np.hstack([pos0, vel0])
+    before = [t for t in times if t < t0]
+    after = [t for t in times if t >= t0]
+    back = _integrate_one_way(y0, t0, before[::-1], tol, perturbers)[::-1]
+    forward = _integrate_one_way(y0, t0, after, tol, perturbers)
+    return np.stack(back + forward, axis=1) if times else np.empty((pos0.shape[0], 0, 3))
+
+
+def integrate_chunk(
+    chunk: tuple[float, list[tuple[int, OrbitalElements]], list[float]],
+) -> list[tuple[int, list[list[float]] | None]]:
+    """Process-pool task: integrate objects that share one osculating epoch.
+
+    If the shared integration fails, each body is retried alone so the one
+    that broke it gets ``None`` and the rest still get trajectories.
+    """
+    epoch_jd, items, times = chunk
+    el = np.array([[x.a, x.e, x.i_deg, x.Omega_deg, x.omega_deg, x.M0_rad] for _, x in items])
+    pos0, vel0 = state_vectors(*el.T, np.full(len(items), epoch_jd), epoch_jd)
+    try:
+        traj = integrate_positions(pos0, vel0, epoch_jd, times)
+    except IntegrationError:
+        if len(items) == 1:
+            return [(items[0][0], None)]
+        return [part for item in items for part in integrate_chunk((epoch_jd, [item], times))]
+    return [(key, traj[k].tolist()) for k, (key, _) in enumerate(items)]
+
+
+def make_chunks(
+    items: list[tuple[int, OrbitalElements]], times: list[float], chunk_size: int
+) -> list[tuple[float, list[tuple[int, OrbitalElements]], list[float]]]:
+    """Group by epoch (particles in one state array must start together), then split.
+
+    Unbound orbits are dropped: their state vectors are NaN and, since the
+    step size is shared, one of them would stall its whole chunk.
+    """
+    by_epoch: dict[float, list[tuple[int, OrbitalElements]]] = {}
+    for item in items:
+        if not is_bound(item[1]):
+            continue
+        by_epoch.setdefault(item[1].epoch_jd, []).append(item)
+    chunks = []
+    for epoch_jd, group in sorted(by_epoch.items()):
+        for k in range(0, len(group), chunk_size):
+            chunks.append((epoch_jd, group[k : k + chunk_size], times))
+    return chunks
+
+
+def cache_key(pk: int, elements: OrbitalElements, times: list[float]) -> str:
+    # Elements are part of the key so a re-import invalidates old trajectories.
+    window = f"{times[0]}:{times[-1]}:{len(times)}" if times else "empty"
+    return f"solar:nbody:{pk}:{elements_digest(elements)}:{window}"
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import hashlib
 import math
 from dataclasses import dataclass
 from datetime import date, datetime, timezone
 
+import numpy as np
+
+# Gaussian gravitational constant squared, in AU^3 / year^2 (year = 365.25 d).
+# The scene and the two-body ephemeris use mu=1.0 for a slowed-down animation;
+# anything that is compared with the real sky must use MU_SUN.
+MU_SUN = (0.01720209895 * 365.25) ** 2
+OBLIQUITY_J2000_DEG = 23.4392911
+
 
 def _to_julian_day(dt: datetime) -> float:
     if dt.tzinfo is None:
@@ -25,6 +34,10 @@ def julian_day_from_date(d: date) -> float:
     return _to_julian_day(datetime(d.year, d.month, d.day, tzinfo=timezone.utc))
 
 
+def julian_day_from_datetime(dt: datetime) -> float:
+    return _to_julian_day(dt)
+
+
 @dataclass(frozen=True)
 class OrbitalElements:
     a: float
@@ -36,6 +49,15 @@ class OrbitalElements:
     epoch_jd: float
 
 
+def is_bound(elements: OrbitalElements) -> bool:
+    """Elliptic orbits only; the propagators here do not handle a <= 0 or e >= 1."""
+    return elements.a > 0 and 0 <= elements.e < 1
+
+
+def elements_digest(elements: OrbitalElements) -> str:
+    return hashlib.sha1(repr(elements).encode("utf-8")).hexdigest()
+
+
 def solve_kepler(M: float, e: float, iters: int = 8) -> float:
     M = (M + math.pi) % (2 * math.pi) - math.pi
     if e < 0.8:
@@ -54,6 +76,94 @@ def solve_kepler(M: float, e: float, iters: int = 8) -> float:
     return E
 
 
+def solve_kepler_array(M: np.ndarray, e: np.ndarray, iters: int = 12) -> np.ndarray:
+    M = np.remainder(M + np.pi, 2 * np.pi) - np.pi
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(iters):
+        E = E - (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+    return E
+
+
+def positions_au(
+    a: np.ndarray,
+    e: np.ndarray,
+    i_deg: np.ndarray,
+    Omega_deg: np.ndarray,
+    omega_deg: np.ndarray,
+    M0_rad: np.ndarray,
+    epoch_jd: np.ndarray,
+    t_jd: float,
+    mu: float = 1.0,
+) -> np.ndarray:
+    """Vectorized ``position_au`` over a catalog; returns an (N, 3) ecliptic array."""
+    i = np.radians(i_deg)
+    Omega = np.radians(Omega_deg)
+    omega = np.radians(omega_deg)
+
+    n = np.sqrt(mu / a**3)
+    M = M0_rad + n * ((t_jd - epoch_jd) / 365.25)
+    E = solve_kepler_array(M, e)
+
+    x_p = a * (np.cos(E) - e)
+    y_p = a * np.sqrt(np.maximum(0.0, 1.0 - e * e)) * np.sin(E)
+
+    return _perifocal_to_ecliptic(x_p, y_p, i, Omega, omega)
+
+
+def _perifocal_to_ecliptic(x_p, y_p, i, Omega, omega) -> np.ndarray:
+    co, so = np.cos(omega), np.sin(omega)
+    x1 = x_p * co - y_p * so
+    y1 = x_p * so + y_p * co
+
+    ci, si = np.cos(i), np.sin(i)
+    y2 = y1 * ci
+
+    cO, sO = np.cos(Omega), np.sin(Omega)
+    out = np.empty((x_p.shape[0], 3))
+    out[:, 0] = x1 * cO - y2 * sO
+    out[:, 1] = x1 * sO + y2 * cO
+    out[:, 2] = y1 * si
+    return out
+
+
+def state_vectors(
+    a: np.ndarray,
+    e: np.ndarray,
+    i_deg: np.ndarray,
+    Omega_deg: np.ndarray,
+    omega_deg: np.ndarray,
+    M0_rad: np.ndarray,
+    epoch_jd: np.ndarray,
+    t_jd: float,
+    mu: float = MU_SUN,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Two-body position (AU) and velocity (AU/day) at ``t_jd``, each (N, 3)."""
+    i = np.radians(i_deg)
+    Omega = np.radians(Omega_deg)
+    omega = np.radians(omega_deg)
+
+    n = np.sqrt(mu / a**3)
+    M = M0_rad + n * ((t_jd - epoch_jd) / 365.25)
+    E = solve_kepler_array(M, e)
+    cosE, sinE = np.cos(E), np.sin(E)
+    sqrt1me2 = np.sqrt(np.maximum(0.0, 1.0 - e * e))
+
+    pos = _perifocal_to_ecliptic(a * (cosE - e), a * sqrt1me2 * sinE, i, Omega, omega)
+    edot = a * (n / 365.25) / (1 - e * cosE)
+    vel = _perifocal_to_ecliptic(-edot * sinE, edot * sqrt1me2 * cosE, i, Omega, omega)
+    return pos, vel
+
+
+def ecliptic_to_equatorial(xyz: np.ndarray) -> np.ndarray:
+    eps = math.radians(OBLIQUITY_J2000_DEG)
+    ce, se = math.cos(eps), math.sin(eps)
+    out = np.empty_like(xyz)
+    out[:, 0] = xyz[:, 0]
+    out[:, 1] = xyz[:, 1] * ce - xyz[:, 2] * se
+    out[:, 2] = xyz[:, 1] * se + xyz[:, 2] * ce
+    return out
+
+
 def position_au(elements: OrbitalElements, t_jd: float, mu: float = 1.0) -> tuple[float, float, float]:
     a = elements.a
     e = elements.e
@@ -87,3 +197,26 @@ def position_au(elements: OrbitalElements, t_jd: float, mu: float = 1.0) -> tupl
     z = z2
     return (x, y, z)
 
+
+def sample_times(start_jd: float, stop_jd: float, step_days: float, max_points: int = 5000) -> list[float]:
+    times = []
+    t = start_jd
+    while t <= stop_jd and len(times) < max_points:
+        times.append(t)
+        t += step_days
+    return times
+
+
+def ephemeris_points(elements: OrbitalElements, times: list[float], mu: float = 1.0) -> list[dict[str, float]]:
+    points = []
+    for t in times:
+        x, y, z = position_au(elements, t, mu=mu)
+        points.append({"jd": t, "x": x, "y": y, "z": z})
+    return points
+
+
+def ephemeris_batch(
+    items: list[tuple[int, OrbitalElements]], times: list[float], mu: float = 1.0
+) -> list[tuple[int, list[dict[str, float]]]]:
+    # Top-level and argument-only so it can be shipped to a worker process.
+    return [(key, ephemeris_points(elements, times, mu=mu)) for key, elements in items]
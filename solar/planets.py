@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from .orbits import MU_SUN, OrbitalElements, position_au, positions_au
+
+JD_J2000 = 2451545.0
+
+
+@dataclass(frozen=True)
+class Planet:
+    """Approximate mean elements (Standish, J2000 ecliptic, valid 1800-2050).
+
+    ``L`` is the mean longitude and ``varpi`` the longitude of perihelion;
+    each ``*_dot`` is the rate per Julian century. ``mass_ratio`` is
+    GM_sun / GM_planet.
+    """
+
+    name: str
+    a: float
+    e: float
+    i_deg: float
+    L_deg: float
+    varpi_deg: float
+    Omega_deg: float
+    a_dot: float
+    e_dot: float
+    i_dot: float
+    L_dot: float
+    varpi_dot: float
+    Omega_dot: float
+    mass_ratio: float
+
+    @property
+    def mu(self) -> float:
+        return MU_SUN / self.mass_ratio
+
+    def elements_at(self, t_jd: float) -> OrbitalElements:
+        T = (t_jd - JD_J2000) / 36525.0
+        L = self.L_deg + self.L_dot * T
+        varpi = self.varpi_deg + self.varpi_dot * T
+        Omega = self.Omega_deg + self.Omega_dot * T
+        return OrbitalElements(
+            a=self.a + self.a_dot * T,
+            e=self.e + self.e_dot * T,
+            i_deg=self.i_deg + self.i_dot * T,
+            Omega_deg=Omega,
+            omega_deg=varpi - Omega,
+            M0_rad=math.radians(L - varpi),
+            epoch_jd=t_jd,
+        )
+
+
+# Same bodies as static/app/planets.js; Earth is the Earth-Moon barycenter.
+PLANETS: tuple[Planet, ...] = (
+    Planet("Mercury", 0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593,
+           0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081, 6023600.0),
+    Planet("Venus", 0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255,
+           0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418, 408523.71),
+    Planet("Earth", 1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0,
+           0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0, 328900.56),
+    Planet("Mars", 1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891,
+           0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343, 3098708.0),
+    Planet("Jupiter", 5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909,
+           -0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106, 1047.3486),
+    Planet("Saturn", 9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448,
+           -0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794, 3497.898),
+    Planet("Uranus", 19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503,
+           -0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589, 22902.98),
+    Planet("Neptune", 30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574,
+           0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664, 19412.24),
+)
+
+
+def planet_by_name(name: str) -> Planet:
+    for p in PLANETS:
+        if p.name.lower() == str(name).lower():
+            return p
+    raise KeyError(name)
+
+
+def heliocentric_au(planet: Planet, t_jd: float) -> np.ndarray:
+    # Elements are osculated at t_jd itself, so no propagation is needed.
+    return np.array(position_au(planet.elements_at(t_jd), t_jd, mu=MU_SUN))
+
+
+def earth_heliocentric_au(t_jd: float) -> np.ndarray:
+    return heliocentric_au(planet_by_name("Earth"), t_jd)
+
+
+_BASE = np.array([[p.a, p.e, p.i_deg, p.L_deg, p.varpi_deg, p.Omega_deg] for p in PLANETS])
+_RATE = np.array([[p.a_dot, p.e_dot, p.i_dot, p.L_dot, p.varpi_dot, p.Omega_dot] for p in PLANETS])
+# GM of each planet in AU^3 / day^2, aligned with PLANETS.
+PLANET_GM_DAY = np.array([p.mu for p in PLANETS]) / 365.25**2
+
+
+def planet_positions_au(t_jd: float) -> np.ndarray:
+    """Heliocentric positions of all PLANETS at ``t_jd`` as an (8, 3) array."""
+    a, e, i, L, varpi, Omega = (_BASE + _RATE * ((t_jd - JD_J2000) / 36525.0)).T
+    return positions_au(a, e, i, Omega, varpi - Omega, np.radians(L - varpi), np.full(a.shape, t_jd), t_jd, mu=MU_SUN)
@@ -21,6 +21,7 @@ class SmallBodySerializer(serializers.ModelSerializer):
             "Omega",
             "omega",
             "M0",
+            "M0_known",
             "epoch",
             "H",
             "q",
@@ -47,6 +48,7 @@ class SmallBodyExploreSerializer(serializers.ModelSerializer):
             "Omega",
             "omega",
             "M0",
+            "M0_known",
             "epoch",
             "H",
             "q",
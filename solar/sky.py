@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import connections
+
+from .models import SmallBody
+from .orbits import MU_SUN, ecliptic_to_equatorial, positions_au
+from .planets import earth_heliocentric_au
+
+# Default slope parameter; the catalog carries H but not G.
+DEFAULT_G = 0.15
+UNIX_EPOCH_JD = 2440587.5
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """Whole-catalog element arrays, one row per SmallBody."""
+
+    ids: np.ndarray
+    a: np.ndarray
+    e: np.ndarray
+    i: np.ndarray
+    Omega: np.ndarray
+    omega: np.ndarray
+    M0: np.ndarray
+    epoch_jd: np.ndarray
+    H: np.ndarray
+    q: np.ndarray
+    M0_known: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return int(self.ids.shape[0])
+
+    def take(self, idx: np.ndarray) -> "Catalog":
+        return Catalog(*(getattr(self, f)[idx] for f in self.__dataclass_fields__))
+
+
+_COLUMNS = ("id", "a", "e", "i", "Omega_node", "omega", "M0", "epoch", "H", "M0_known")
+
+
+def load_catalog(using: str) -> Catalog:
+    # Raw cursor: building a million model instances (or date objects) would
+    # dominate the cost of everything downstream.
+    meta = SmallBody._meta
+    cols = ", ".join(meta.get_field(f).column for f in _COLUMNS)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"SELECT {cols} FROM {meta.db_table}")
+        rows = cursor.fetchall()
+    if not rows:
+        empty = np.empty(0)
+        return Catalog(np.empty(0, dtype=np.int64), *([empty] * 9), np.empty(0, dtype=bool))
+    ids, a, e, i, Omega, omega, M0, epoch, H, M0_known = zip(*rows)
+    a_arr = np.asarray(a, dtype=float)
+    e_arr = np.asarray(e, dtype=float)
+    epoch_days = np.asarray([str(x) for x in epoch], dtype="datetime64[D]").astype(np.int64)
+    return Catalog(
+        ids=np.asarray(ids, dtype=np.int64),
+        a=a_arr,
+        e=e_arr,
+        i=np.asarray(i, dtype=float),
+        Omega=np.asarray(Omega, dtype=float),
+        omega=np.asarray(omega, dtype=float),
+        M0=np.asarray(M0, dtype=float),
+        epoch_jd=epoch_days + UNIX_EPOCH_JD,
+        H=np.asarray(H, dtype=float),  # NULL -> nan
+        q=a_arr * (1.0 - e_arr),
+        M0_known=np.asarray(M0_known, dtype=bool),
+    )
+
+
+_load_lock = threading.Lock()
+_cache: dict[str, tuple[tuple, Catalog]] = {}
+
+
+def _fingerprint(using: str) -> tuple:
+    # Inserts and deletes move the count or max id; import_dataset's
+    # bulk_update moves MAX(updated_at). All three are index lookups.
+    # Separate subqueries: SQLite only answers a lone MIN/MAX from the index.
+    meta = SmallBody._meta
+    table = meta.db_table
+    updated = meta.get_field("updated_at").column
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT (SELECT COUNT(*) FROM {table}), (SELECT COALESCE(MAX(id), 0) FROM {table}), "
+            f"(SELECT MAX({updated}) FROM {table})"
+        )
+        count, max_id, max_updated = cursor.fetchone()
+    return int(count), int(max_id), str(max_updated)
+
+
+def cached_catalog(using: str) -> Catalog:
+    """Process-wide catalog, reloaded only when the table's fingerprint changes.
+
+    The rebuild runs outside any lock readers wait on: while one thread
+    reloads, the others keep getting the previous catalog. Only a cold
+    start, with nothing to serve yet, waits for the first load.
+    """
+    fingerprint = _fingerprint(using)
+    hit = _cache.get(using)
+    if hit and hit[0] == fingerprint:
+        return hit[1]
+    if not _load_lock.acquire(blocking=hit is None):
+        return hit[1]
+    try:
+        hit = _cache.get(using)
+        if hit and hit[0] == fingerprint:
+            return hit[1]
+        catalog = load_catalog(using)
+        _cache[using] = (fingerprint, catalog)
+        return catalog
+    finally:
+        _load_lock.release()
+
+
+def hg_magnitude(H: np.ndarray, r: np.ndarray, delta: np.ndarray, alpha: np.ndarray, G: float = DEFAULT_G) -> np.ndarray:
+    """IAU H-G apparent V magnitude; ``alpha`` is the phase angle in radians."""
+    tan_half = np.tan(alpha / 2)
+    phi1 = np.exp(-3.33 * tan_half**0.63)
+    phi2 = np.exp(-1.87 * tan_half**1.22)
+    return H + 5 * np.log10(r * delta) - 2.5 * np.log10((1 - G) * phi1 + G * phi2)
+
+
+@dataclass(frozen=True)
+class SkyResult:
+    ids: np.ndarray
+    ra_deg: np.ndarray
+    dec_deg: np.ndarray
+    delta_au: np.ndarray
+    r_au: np.ndarray
+    phase_deg: np.ndarray
+    elong_deg: np.ndarray
+    V: np.ndarray
+    total: int
+    candidates: int
+    brighter: int
+    unknown_phase: int
+
+
+def visible_from_earth(catalog: Catalog, t_jd: float, mag_limit: float, limit: int) -> SkyResult:
+    earth = earth_heliocentric_au(t_jd)
+    R = float(np.linalg.norm(earth))
+
+    # Cheap rejection before propagation: elliptic orbits with known H only,
+    # and only where M0 came from the dataset (a placeholder phase would put
+    # the body anywhere on its orbit). For q > R the brightest possible V is
+    # at perihelion with Earth on the same side of the Sun,
+    # H + 5 log10(q (q - R)); the phase term only dims.
+    ok = np.isfinite(catalog.H) & (catalog.a > 0) & (catalog.e >= 0) & (catalog.e < 1)
+    unknown_phase = int(np.count_nonzero(ok & ~catalog.M0_known))
+    ok &= catalog.M0_known
+    outside = catalog.q > R
+    with np.errstate(divide="ignore", invalid="ignore"):
+        best_v = catalog.H + 5 * np.log10(catalog.q * (catalog.q - R))
+    ok &= ~outside | (best_v <= mag_limit)
+    cand = catalog.take(np.flatnonzero(ok))
+
+    helio = positions_au(cand.a, cand.e, cand.i, cand.Omega, cand.omega, cand.M0, cand.epoch_jd, t_jd, mu=MU_SUN)
+    geo = helio - earth
+    r = np.linalg.norm(helio, axis=1)
+    delta = np.linalg.norm(geo, axis=1)
+
+    cos_alpha = np.clip((r * r + delta * delta - R * R) / (2 * r * delta), -1.0, 1.0)
+    alpha = np.arccos(cos_alpha)
+    V = hg_magnitude(cand.H, r, delta, alpha)
+
+    bright = np.flatnonzero(V <= mag_limit)
+    order = bright[np.argsort(V[bright], kind="stable")][:limit]
+
+    eq = ecliptic_to_equatorial(geo[order])
+    d = delta[order]
+    ra = np.degrees(np.arctan2(eq[:, 1], eq[:, 0])) % 360.0
+    dec = np.degrees(np.arcsin(np.clip(eq[:, 2] / d, -1.0, 1.0)))
+    cos_elong = np.clip((R * R + d * d - r[order] ** 2) / (2 * R * d), -1.0, 1.0)
+
+    return SkyResult(
+        ids=cand.ids[order],
+        ra_deg=ra,
+        dec_deg=dec,
+        delta_au=d,
+        r_au=r[order],
+        phase_deg=np.degrees(alpha[order]),
+        elong_deg=np.degrees(np.arccos(cos_elong)),
+        V=V[order],
+        total=catalog.size,
+        candidates=cand.size,
+        brighter=int(bright.shape[0]),
+        unknown_phase=unknown_phase,
+    )
@@ -0,0 +1,245 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from .chebyshev import evaluate, fit_bodies, from_bytes, sample_model
+from .compute import ComputeTimeout, HeavySlot, inflight
+from .live import FRAME_HEADER, KIND_DELTA, KIND_KEY, SubscriptionError, _Channel, _Viewer, parse_subscription
+from .models import SmallBody
+from .nbody import integrate_chunk, integrate_positions
+from .orbits import MU_SUN, OrbitalElements, julian_day_from_datetime, positions_au, state_vectors
+from .planets import earth_heliocentric_au
+from .sky import Catalog, hg_magnitude, visible_from_earth
+
+EPOCH_JD = 2461000.5
+# Ceres-, Pallas- and Eros-like orbits, the last one fairly eccentric.
+ELEMENTS = [
+    OrbitalElements(2.7656, 0.0795, 10.588, 80.249, 73.29, 4.0409, EPOCH_JD),
+    OrbitalElements(2.7700, 0.2306, 34.930, 172.890, 310.93, 1.1000, EPOCH_JD),
+    OrbitalElements(1.4580, 0.2230, 10.830, 304.300, 178.90, 2.5000, EPOCH_JD),
+]
+
+
+def _rows(items):
+    return np.array([[x.a, x.e, x.i_deg, x.Omega_deg, x.omega_deg, x.M0_rad, x.epoch_jd] for x in items])
+
+
+class NBodyTests(SimpleTestCase):
+    def test_unperturbed_integration_matches_kepler(self):
+        el = _rows(ELEMENTS)
+        times = [EPOCH_JD + d for d in range(-365, 366, 73)]
+        pos0, vel0 = state_vectors(*el.T, EPOCH_JD, mu=MU_SUN)
+        traj = integrate_positions(pos0, vel0, EPOCH_JD, times, perturbers=False)
+        kepler = np.stack([positions_au(*el.T, t, mu=MU_SUN) for t in times], axis=1)
+        self.assertLess(float(np.abs(traj - kepler).max()), 1e-8)
+
+    def test_unbound_body_fails_fast_without_blocking_its_chunk(self):
+        hyperbolic = OrbitalElements(-1.27, 1.2, 10.0, 80.0, 73.0, 0.2, EPOCH_JD)
+        times = [EPOCH_JD + 10 * k for k in range(20)]
+        started = time.monotonic()
+        with np.errstate(invalid="ignore"):  # its state vectors are NaN by design
+            result = dict(integrate_chunk((EPOCH_JD, [(1, ELEMENTS[0]), (2, hyperbolic)], times)))
+        self.assertLess(time.monotonic() - started, 10.0)
+        self.assertIsNone(result[2])
+        self.assertEqual(len(result[1]), len(times))
+
+
+class ChebyshevTests(SimpleTestCase):
+    def _check(self, model, start_jd, stop_jd, bound):
+        fits = fit_bodies(model, ELEMENTS, start_jd, stop_jd, 32.0, 10, bound)
+        # Off-node sample times, not the check points the fit was judged on.
+        times = np.linspace(start_jd + 0.37, stop_jd - 0.37, 97)
+        reference = sample_model(model, ELEMENTS, times)
+        for k, fit in enumerate(fits):
+            self.assertLessEqual(fit.max_error_au, bound)
+            coeffs = from_bytes(fit.to_bytes(), 10)  # as stored in ChebyshevEphemeris
+            approx = evaluate(coeffs, fit.start_jd, fit.segment_days, times)
+            self.assertLess(float(np.linalg.norm(approx - reference[k], axis=1).max()), bound)
+
+    def test_kepler_fit_error_bound(self):
+        self._check("kepler", EPOCH_JD - 30, EPOCH_JD + 365, 1e-10)
+
+    def test_nbody_fit_error_bound(self):
+        self._check("nbody", EPOCH_JD - 30, EPOCH_JD + 120, 1e-9)
+
+    def test_nbody_body_that_cannot_be_integrated_is_left_unfitted(self):
+        hyperbolic = OrbitalElements(-1.27, 1.2, 10.0, 80.0, 73.0, 0.2, EPOCH_JD)
+        with np.errstate(invalid="ignore"):
+            fits = fit_bodies("nbody", [ELEMENTS[0], hyperbolic], EPOCH_JD, EPOCH_JD + 64, 32.0, 10, 1e-9)
+        self.assertIsNotNone(fits[0])
+        self.assertLessEqual(fits[0].max_error_au, 1e-9)
+        self.assertIsNone(fits[1])
+
+
+class SkyTests(SimpleTestCase):
+    T_JD = EPOCH_JD + 100
+
+    def _catalog(self, n: int = 4000) -> Catalog:
+        # Orbits from inside Earth's to the outer belt, so plenty fall either
+        # side of the q > R pre-filter and of the magnitude limit.
+        rng = np.random.default_rng(7)
+        a = rng.uniform(0.7, 4.0, n)
+        e = rng.uniform(0.0, 0.7, n)
+        angles = [rng.uniform(0, 30, n), rng.uniform(0, 360, n), rng.uniform(0, 360, n), rng.uniform(0, 2 * np.pi, n)]
+        H = rng.uniform(4, 18, n)
+        return Catalog(np.arange(1, n + 1), a, e, *angles, np.full(n, EPOCH_JD), H, a * (1 - e), np.ones(n, bool))
+
+    def _brute_force_v(self, cat: Catalog) -> np.ndarray:
+        earth = earth_heliocentric_au(self.T_JD)
+        R = np.linalg.norm(earth)
+        helio = positions_au(cat.a, cat.e, cat.i, cat.Omega, cat.omega, cat.M0, cat.epoch_jd, self.T_JD, mu=MU_SUN)
+        r = np.linalg.norm(helio, axis=1)
+        delta = np.linalg.norm(helio - earth, axis=1)
+        alpha = np.arccos(np.clip((r * r + delta * delta - R * R) / (2 * r * delta), -1.0, 1.0))
+        return hg_magnitude(cat.H, r, delta, alpha)
+
+    def test_earth_longitude_at_march_equinox(self):
+        # The Sun is at 0 deg of date, so Earth is at 180 deg less ~25 years of precession in J2000.
+        equinox = julian_day_from_datetime(datetime(2025, 3, 20, 9, 1, tzinfo=timezone.utc))
+        x, y, _ = earth_heliocentric_au(equinox)
+        self.assertAlmostEqual(float(np.degrees(np.arctan2(y, x))) % 360.0, 179.66, delta=0.02)
+
+    def test_prefilter_keeps_every_body_brighter_than_the_limit(self):
+        cat = self._catalog()
+        result = visible_from_earth(cat, self.T_JD, 12.0, cat.size)
+        expected = cat.ids[self._brute_force_v(cat) <= 12.0]
+        self.assertLess(result.candidates, cat.size)  # the pre-filter did drop bodies
+        self.assertGreater(expected.size, 100)
+        self.assertEqual(set(result.ids.tolist()), set(expected.tolist()))
+
+    def test_results_are_sorted_by_magnitude_and_cut_at_limit(self):
+        cat = self._catalog()
+        result = visible_from_earth(cat, self.T_JD, 12.0, 50)
+        V = self._brute_force_v(cat)
+        self.assertEqual(result.ids.tolist(), cat.ids[np.argsort(V)][:50].tolist())
+        self.assertTrue(np.all(np.diff(result.V) >= 0))
+        self.assertGreater(result.brighter, 50)
+
+
+def _decode(frame: bytes, state: np.ndarray | None) -> tuple[int, np.ndarray]:
+    """Mirror of static/app/live.js: float32 keyframes, int16 deltas applied in float32."""
+    _, _, kind, _, tick, _, count, _, scale = FRAME_HEADER.unpack_from(frame)
+    body = frame[FRAME_HEADER.size :]
+    if kind == KIND_KEY:
+        return tick, np.frombuffer(body, dtype="<f4").reshape(count, 3).copy()
+    q = np.frombuffer(body, dtype="<i2").reshape(count, 3)
+    return tick, (state + q.astype(np.float32) * np.float32(scale)).astype(np.float32)
+
+
+class LiveFrameTests(SimpleTestCase):
+    def _channel(self) -> _Channel:
+        return _Channel(("ids", ("1", "2", "3"), 1.0, 10), [1, 2, 3], _rows(ELEMENTS), rate=1.0, fps=10)
+
+    def test_deltas_reconstruct_without_drift(self):
+        channel = self._channel()
+        state = None
+        deltas = 0
+        for tick in range(250):
+            pos = channel._positions(EPOCH_JD + 0.5 * tick)
+            frame = channel._encode(tick, max(0, tick - 1), EPOCH_JD + 0.5 * tick, pos)
+            if frame.delta is not None:
+                deltas += 1
+            _, state = _decode(frame.delta if frame.delta is not None else frame.key, state)
+            # Bit-identical to what the server assumes clients hold, and one quantum from the truth.
+            np.testing.assert_array_equal(state, channel.recon)
+            self.assertLess(float(np.abs(state - pos).max()), float(channel.scale) + 1e-6)
+        self.assertGreater(deltas, 200)
+
+    def test_viewer_that_skipped_a_frame_gets_a_keyframe(self):
+        channel = self._channel()
+        viewer = _Viewer(ack_window=None)
+
+        def offer(tick):
+            viewer.offer(channel._encode(tick, max(0, tick - 1), EPOCH_JD + tick, channel._positions(EPOCH_JD + tick)))
+
+        offer(0)
+        viewer.take()
+        offer(1)
+        offer(2)  # replaces tick 1 before it was sent
+        self.assertEqual(viewer.dropped, 1)
+        self.assertEqual(FRAME_HEADER.unpack_from(viewer.take())[2], KIND_KEY)
+        offer(3)
+        self.assertEqual(FRAME_HEADER.unpack_from(viewer.take())[2], KIND_DELTA)
+
+    def test_near_equal_rates_share_a_channel(self):
+        a, _ = parse_subscription('{"layers": "neo", "rate": 1.0001}')
+        b, _ = parse_subscription('{"layers": "neo", "rate": 1.0002}')
+        self.assertEqual(a, b)
+        with self.assertRaises(SubscriptionError):
+            parse_subscription('{"layers": "neo", "rate": NaN}')
+
+    def test_malformed_subscriptions_are_rejected(self):
+        for raw in ['{"ids": "15"}', '{"ids": 5}', '{"limit": "x"}', '{"fps": 1e400}', '[1, 2]', "not json"]:
+            with self.subTest(raw=raw), self.assertRaises(SubscriptionError):
+                parse_subscription(raw)
+        key, _ = parse_subscription('{"ids": ["15", 1]}')
+        self.assertEqual(key[:2], ("ids", ("1", "15")))
+
+
+class HeavySlotTests(SimpleTestCase):
+    def test_slot_is_held_until_timed_out_work_finishes(self):
+        release = threading.Event()
+
+        async def run():
+            with self.assertRaises(ComputeTimeout):
+                async with HeavySlot(timeout=0.05) as slot:
+                    await slot.run_thread(release.wait, 5)
+            return inflight()
+
+        self.assertEqual(asyncio.run(run()), 1)
+        release.set()
+        deadline = time.monotonic() + 5
+        while inflight() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(inflight(), 0)
+
+
+class EphemerisRequestTests(TransactionTestCase):
+    # Heavy views read on pool threads, which only see committed rows.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        common = dict(category=SmallBody.Category.MAINBELT, i=10.0, Omega_node=80.0, omega=73.0, M0=1.0)
+        self.ceres = SmallBody.objects.create(
+            name="Ceres", spkid="2000001", a=2.7656, e=0.0795, epoch=date(2025, 11, 21), **common
+        )
+        self.hyperbolic = SmallBody.objects.create(
+            name="Oumuamua", spkid="3788040", a=-1.27, e=1.2, epoch=date(2017, 11, 23), **common
+        )
+        self.window = "start=2026-01-01&stop=2026-02-01&step=1d"
+
+    def test_busy_server_answers_429_with_retry_after(self):
+        with override_settings(SOLAR_COMPUTE_MAX_INFLIGHT=0):
+            response = self.client.get(f"/api/object/{self.ceres.pk}/ephemeris/?{self.window}")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_exhausted_time_budget_answers_504(self):
+        with override_settings(SOLAR_COMPUTE_TIMEOUT=0):
+            response = self.client.get(f"/api/ephemeris/?ids={self.ceres.pk}&{self.window}")
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(inflight(), 0)
+
+    def test_unbound_orbit_answers_422(self):
+        response = self.client.get(f"/api/object/{self.hyperbolic.spkid}/ephemeris/?{self.window}")
+        self.assertEqual(response.status_code, 422)
+
+    def test_non_finite_step_answers_400(self):
+        for step in ("inf", "nan", "-infh"):
+            with self.subTest(step=step):
+                url = f"/api/object/{self.ceres.pk}/ephemeris/?start=2026-01-01&stop=2026-02-01&step={step}"
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_batch_reports_missing_and_unsupported_ids_apart(self):
+        ids = f"{self.ceres.spkid},no-such-body,{self.hyperbolic.spkid}"
+        response = self.client.get(f"/api/ephemeris/?ids={ids}&{self.window}")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["missing"], ["no-such-body"])
+        self.assertEqual(body["unsupported"], [self.hyperbolic.spkid])
+        self.assertEqual([r["object"]["id"] for r in body["results"]], [self.ceres.pk])
+        self.assertEqual(len(body["results"][0]["points"]), 32)
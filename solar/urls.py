@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -7,7 +8,11 @@ urlpatterns = [
     path("search/", views.search),
     path("stats/", views.stats),
     path("explore/", views.explore_sample),
+    path("ephemeris/", views.ephemeris_batch),
+    path("sky/", views.sky),
     path("object/<id>/", views.object_detail),
     path("object/<id>/ephemeris/", views.ephemeris),
 ]
 
+if settings.SOLAR_DB_METRICS:
+    urlpatterns.append(path("_metrics/", views.db_metrics))
@@ -2,19 +2,41 @@ from __future__ import annotations
 
 import math
 import random
-from datetime import date, datetime
+from datetime import date, datetime, timezone
+from functools import partial
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q
-from django.http import Http404
+from django.http import Http404, HttpRequest, JsonResponse
 from rest_framework.decorators import api_view
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from .models import SmallBody
-from .orbits import OrbitalElements, julian_day_from_date, position_au
+from .chebyshev import evaluate as chebyshev_evaluate, from_bytes as chebyshev_coeffs
+from .compute import ComputeBusy, ComputeTimeout, HeavySlot, inflight as compute_inflight
+from .db import query_metrics
+from .models import ChebyshevEphemeris, SmallBody
+from .nbody import cache_key as nbody_cache_key, integrate_chunk, make_chunks
+from .orbits import (
+    MU_SUN,
+    OrbitalElements,
+    elements_digest,
+    ephemeris_batch as ephemeris_batch_points,
+    ephemeris_points,
+    is_bound,
+    julian_day_from_date,
+    julian_day_from_datetime,
+    sample_times,
+)
+from .sky import cached_catalog, visible_from_earth
 from .serializers import SmallBodyExploreSerializer, SmallBodySerializer
 
 
+def _bodies():
+    return SmallBody.objects.using(settings.SOLAR_READ_DB)
+
+
 def _parse_category(raw: str | None) -> str:
     raw = (raw or "any").lower().strip()
     allowed = {"neo", "mainbelt", "trojan", "comet", "any"}
@@ -32,7 +54,7 @@ def _filter_by_category(qs, category: str):
 @api_view(["GET"])
 def random_object(request: Request) -> Response:
     category = _parse_category(request.query_params.get("category"))
-    qs = _filter_by_category(SmallBody.objects.all(), category)
+    qs = _filter_by_category(_bodies(), category)
     if not qs.exists():
         return Response({"detail": "No objects in this category. Import dataset first.", "missing": True})
     max_id = qs.order_by("-id").values_list("id", flat=True).first()
@@ -52,7 +74,7 @@ def search(request: Request) -> Response:
     q = (request.query_params.get("q") or "").strip()
     if not q:
         return Response({"results": []})
-    qs = SmallBody.objects.filter(Q(name__icontains=q) | Q(spkid__icontains=q)).order_by("name")[:50]
+    qs = _bodies().filter(Q(name__icontains=q) | Q(spkid__icontains=q)).order_by("name")[:50]
     return Response({"results": SmallBodyExploreSerializer(qs, many=True).data})
 
 
@@ -61,7 +83,7 @@ def _get_object_or_404(id: str) -> SmallBody:
     if not raw:
         raise Http404
 
-    qs = SmallBody.objects.all()
+    qs = _bodies()
     q = Q(spkid=raw) | Q(name__iexact=raw)
 
     if raw.isdigit():
@@ -69,6 +91,15 @@ def _get_object_or_404(id: str) -> SmallBody:
 
     try:
         return qs.get(q)
+    except SmallBody.MultipleObjectsReturned:
+        # A numeric designation (e.g. "4") can match one row by spkid and another by pk,
+        # and names are not unique. Prefer spkid, then pk, then the oldest name match.
+        obj = qs.filter(spkid=raw).order_by("id").first()
+        if obj is None and raw.isdigit():
+            obj = qs.filter(pk=int(raw)).first()
+        if obj is None:
+            obj = qs.filter(name__iexact=raw).order_by("id").first()
+        return obj
     except (SmallBody.DoesNotExist, ValueError) as exc:
         raise Http404 from exc
 
@@ -88,71 +119,249 @@ def _parse_step(raw: str) -> float:
     return float(raw)
 
 
-@api_view(["GET"])
-def ephemeris(request: Request, id: str) -> Response:
-    obj = _get_object_or_404(id)
-
-    start_s = request.query_params.get("start")
-    stop_s = request.query_params.get("stop")
-    step_s = request.query_params.get("step", "1d")
+def _parse_window(params) -> tuple[date, date, float]:
+    start_s = params.get("start")
+    stop_s = params.get("stop")
+    step_s = params.get("step", "1d")
     if not start_s or not stop_s:
-        return Response({"detail": "start and stop are required (YYYY-MM-DD)."}, status=400)
-
+        raise ValueError("start and stop are required (YYYY-MM-DD).")
     start = date.fromisoformat(start_s)
     stop = date.fromisoformat(stop_s)
-    step_days = max(0.25, _parse_step(step_s))
+    step_days = _parse_step(step_s)
+    if not math.isfinite(step_days):
+        raise ValueError("step must be a finite number of days or hours.")
+    step_days = max(0.25, step_days)
     if stop < start:
         start, stop = stop, start
-
-    start_jd = julian_day_from_date(start)
-    stop_jd = julian_day_from_date(stop)
-
-    elements = OrbitalElements(
-        a=obj.a,
-        e=obj.e,
-        i_deg=obj.i,
-        Omega_deg=obj.Omega_node,
-        omega_deg=obj.omega,
-        M0_rad=obj.M0,
-        epoch_jd=julian_day_from_date(obj.epoch),
+    return start, stop, step_days
+
+
+def _parse_model(raw: str | None) -> str:
+    model = (raw or "kepler").lower().strip()
+    if model not in {"kepler", "nbody"}:
+        raise ValueError("model must be 'kepler' or 'nbody'.")
+    return model
+
+
+# mu in AU^3/yr^2 for each ``gm`` choice. "scene" is the animation's mu=1;
+# "sun" is the real solar GM, which is what the n-body model always uses.
+GM_CHOICES = {"scene": 1.0, "sun": MU_SUN}
+
+
+def _parse_gm(raw: str | None, model: str) -> str:
+    gm = (raw or ("sun" if model == "nbody" else "scene")).lower().strip()
+    if gm not in GM_CHOICES:
+        raise ValueError("gm must be 'scene' or 'sun'.")
+    if model == "nbody" and gm != "sun":
+        raise ValueError("model=nbody is only available with gm=sun.")
+    return gm
+
+
+async def _nbody_trajectories(
+    slot: HeavySlot, items: list[tuple[int, OrbitalElements]], times: list[float]
+) -> dict[int, list[list[float]]]:
+    """Trajectories by pk; bodies that cannot be integrated are left out."""
+    items = [(pk, elements) for pk, elements in items if is_bound(elements)]
+    keys = {pk: nbody_cache_key(pk, elements, times) for pk, elements in items}
+    cached = await cache.aget_many(list(keys.values()))
+    out = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [(pk, elements) for pk, elements in items if pk not in out]
+    if missing:
+        chunks = make_chunks(missing, times, int(getattr(settings, "SOLAR_NBODY_CHUNK", 32)))
+        results = await slot.map_process(integrate_chunk, chunks)
+        fresh = {pk: traj for part in results for pk, traj in part if traj is not None}
+        await cache.aset_many(
+            {keys[pk]: traj for pk, traj in fresh.items()},
+            timeout=int(getattr(settings, "SOLAR_NBODY_CACHE_TTL", 86400)),
+        )
+        out.update(fresh)
+    return out
+
+
+def _load_chebyshev(
+    items: list[tuple[int, OrbitalElements]], model: str, times: list[float]
+) -> dict[int, tuple[list[list[float]], float]]:
+    """Trajectories served from build_ephemeris fits that cover ``times`` and match current elements."""
+    if not times or not items:
+        return {}
+    digests = {pk: elements_digest(elements) for pk, elements in items}
+    rows = ChebyshevEphemeris.objects.using(settings.SOLAR_READ_DB).filter(
+        model=model, body_id__in=list(digests), start_jd__lte=times[0], stop_jd__gte=times[-1]
     )
+    out = {}
+    for row in rows:
+        if row.elements_hash != digests[row.body_id]:
+            continue
+        coeffs = chebyshev_coeffs(row.coeffs, row.degree)
+        out[row.body_id] = (chebyshev_evaluate(coeffs, row.start_jd, row.segment_days, times).tolist(), row.max_error_au)
+    return out
+
+
+def _points(times: list[float], traj: list[list[float]]) -> list[dict[str, float]]:
+    return [{"jd": t, "x": x, "y": y, "z": z} for t, (x, y, z) in zip(times, traj)]
+
+
+def _heavy_error(exc: Exception) -> JsonResponse:
+    if isinstance(exc, ComputeBusy):
+        response = JsonResponse({"detail": "Server is busy with other computations. Retry shortly."}, status=429)
+        response["Retry-After"] = "1"
+        return response
+    return JsonResponse({"detail": "Computation timed out."}, status=504)
 
-    points = []
-    t = start_jd
-    max_points = 5000
-    while t <= stop_jd and len(points) < max_points:
-        x, y, z = position_au(elements, t, mu=1.0)
-        points.append({"jd": t, "x": x, "y": y, "z": z})
-        t += step_days
 
-    return Response(
+def _load_ephemeris_object(id: str) -> tuple[dict, OrbitalElements]:
+    obj = _get_object_or_404(id)
+    return SmallBodySerializer(obj).data, obj.orbital_elements()
+
+
+async def ephemeris(request: HttpRequest, id: str) -> JsonResponse:
+    try:
+        start, stop, step_days = _parse_window(request.GET)
+        model = _parse_model(request.GET.get("model"))
+        gm = _parse_gm(request.GET.get("gm"), model)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+
+    times = sample_times(julian_day_from_date(start), julian_day_from_date(stop), step_days, max_points=5000)
+    # Stored kepler fits are in scene units, so they cannot answer gm=sun.
+    use_fits = not (model == "kepler" and gm == "sun")
+    try:
+        async with HeavySlot() as slot:
+            data, elements = await slot.run_thread(_load_ephemeris_object, id)
+            if not is_bound(elements):
+                return JsonResponse({"detail": "Only elliptic orbits (a > 0, e < 1) are supported."}, status=422)
+            fitted = await slot.run_thread(_load_chebyshev, [(data["id"], elements)], model, times) if use_fits else {}
+            fit_error = None
+            if data["id"] in fitted:
+                traj, fit_error = fitted[data["id"]]
+                points = _points(times, traj)
+            elif model == "nbody":
+                trajectories = await _nbody_trajectories(slot, [(data["id"], elements)], times)
+                if data["id"] not in trajectories:
+                    return JsonResponse({"detail": "The n-body integration failed for this orbit."}, status=422)
+                points = _points(times, trajectories[data["id"]])
+            else:
+                points = await slot.run_process(ephemeris_points, elements, times, GM_CHOICES[gm])
+    except Http404:
+        return JsonResponse({"detail": "Not found."}, status=404)
+    except (ComputeBusy, ComputeTimeout) as exc:
+        return _heavy_error(exc)
+
+    return JsonResponse(
         {
-            "object": SmallBodySerializer(obj).data,
+            "object": data,
             "start": start.isoformat(),
             "stop": stop.isoformat(),
             "step_days": step_days,
+            "model": model,
+            "gm": gm,
+            "mu_au3_per_yr2": GM_CHOICES[gm],
+            "source": "chebyshev" if fit_error is not None else model,
+            "fit_error_au": fit_error,
             "points": points,
         }
     )
 
 
-@api_view(["GET"])
-def explore_sample(request: Request) -> Response:
-    limit = int(request.query_params.get("limit", "5000"))
+def _load_batch(
+    raw_ids: list[str],
+) -> tuple[list[tuple[str, dict]], list[tuple[int, OrbitalElements]], list[str], list[str]]:
+    objects = []
+    items = []
+    missing = []
+    unsupported = []
+    for raw in raw_ids:
+        try:
+            obj = _get_object_or_404(raw)
+        except Http404:
+            missing.append(raw)
+            continue
+        elements = obj.orbital_elements()
+        if not is_bound(elements):
+            # One hyperbolic or parabolic row must not fail the whole batch.
+            unsupported.append(raw)
+            continue
+        objects.append((raw, SmallBodySerializer(obj).data))
+        items.append((obj.pk, elements))
+    return objects, items, missing, unsupported
+
+
+async def ephemeris_batch(request: HttpRequest) -> JsonResponse:
+    raw_ids = [x.strip() for x in (request.GET.get("ids") or "").split(",") if x.strip()]
+    if not raw_ids:
+        return JsonResponse({"detail": "ids is required (comma-separated)."}, status=400)
+    max_ids = int(getattr(settings, "SOLAR_BATCH_MAX_IDS", 200))
+    if len(raw_ids) > max_ids:
+        return JsonResponse({"detail": f"At most {max_ids} ids per request."}, status=400)
+    try:
+        start, stop, step_days = _parse_window(request.GET)
+        model = _parse_model(request.GET.get("model"))
+        gm = _parse_gm(request.GET.get("gm"), model)
+    except ValueError as exc:
+        return JsonResponse({"detail": str(exc)}, status=400)
+
+    # Keep the total response bounded the way the single-object endpoint is.
+    max_points = max(1, 50000 // len(raw_ids))
+    times = sample_times(julian_day_from_date(start), julian_day_from_date(stop), step_days, max_points=min(5000, max_points))
+    try:
+        async with HeavySlot() as slot:
+            objects, items, missing, unsupported = await slot.run_thread(_load_batch, raw_ids)
+            use_fits = not (model == "kepler" and gm == "sun")
+            fitted = await slot.run_thread(_load_chebyshev, items, model, times) if use_fits else {}
+            points = {pk: _points(times, traj) for pk, (traj, _) in fitted.items()}
+            rest = [item for item in items if item[0] not in fitted]
+            if rest and model == "nbody":
+                trajectories = await _nbody_trajectories(slot, rest, times)
+                points.update({pk: _points(times, traj) for pk, traj in trajectories.items()})
+            elif rest:
+                chunk = int(getattr(settings, "SOLAR_BATCH_CHUNK", 16))
+                chunks = [rest[k : k + chunk] for k in range(0, len(rest), chunk)]
+                results = await slot.map_process(partial(ephemeris_batch_points, times=times, mu=GM_CHOICES[gm]), chunks)
+                points.update({pk: pts for part in results for pk, pts in part})
+    except (ComputeBusy, ComputeTimeout) as exc:
+        return _heavy_error(exc)
+
+    # Bodies the integrator gave up on are reported like unbound ones.
+    unsupported += [raw for raw, o in objects if o["id"] not in points]
+    return JsonResponse(
+        {
+            "start": start.isoformat(),
+            "stop": stop.isoformat(),
+            "step_days": step_days,
+            "model": model,
+            "gm": gm,
+            "mu_au3_per_yr2": GM_CHOICES[gm],
+            "missing": missing,
+            "unsupported": unsupported,
+            "results": [
+                {
+                    "object": o,
+                    "source": "chebyshev" if o["id"] in fitted else model,
+                    "points": points[o["id"]],
+                }
+                for _, o in objects
+                if o["id"] in points
+            ],
+        }
+    )
+
+
+def _explore_payload(params) -> dict:
+    limit = int(params.get("limit", "5000"))
     limit = max(100, min(20000, limit))
-    layers = (request.query_params.get("layers") or "mainbelt,neo,trojan,comet").lower()
+    layers = (params.get("layers") or "mainbelt,neo,trojan,comet").lower()
     wanted = {x.strip() for x in layers.split(",") if x.strip()}
     allowed = {"mainbelt", "neo", "trojan", "comet"}
     wanted = wanted & allowed
-    qs = SmallBody.objects.all()
+    qs = _bodies()
     if wanted:
         qs = qs.filter(category__in=sorted(wanted))
     count = qs.count()
     if count == 0:
-        return Response({"objects": [], "detail": "No objects in DB. Run import_dataset."})
+        return {"objects": [], "detail": "No objects in DB. Run import_dataset."}
     if count <= limit:
         chosen = list(qs[:limit])
-        return Response({"objects": SmallBodyExploreSerializer(chosen, many=True).data, "count": len(chosen)})
+        return {"objects": SmallBodyExploreSerializer(chosen, many=True).data, "count": len(chosen)}
 
     # Fast-ish random sample using id range. Good enough for demo.
     max_id = qs.order_by("-id").values_list("id", flat=True).first()
@@ -173,13 +382,93 @@ def explore_sample(request: Request) -> Response:
         needed = limit - len(chosen)
         filler = list(qs.exclude(id__in=chosen_ids).order_by("id")[:needed])
         chosen.extend(filler)
-    return Response({"objects": SmallBodyExploreSerializer(chosen, many=True).data, "count": len(chosen)})
+    return {"objects": SmallBodyExploreSerializer(chosen, many=True).data, "count": len(chosen)}
+
+
+async def explore_sample(request: HttpRequest) -> JsonResponse:
+    try:
+        async with HeavySlot() as slot:
+            payload = await slot.run_thread(_explore_payload, request.GET)
+    except ValueError:
+        return JsonResponse({"detail": "limit must be an integer."}, status=400)
+    except (ComputeBusy, ComputeTimeout) as exc:
+        return _heavy_error(exc)
+    return JsonResponse(payload)
+
+
+def _parse_time(raw: str | None) -> datetime:
+    raw = (raw or "").strip()
+    if not raw:
+        return datetime.now(timezone.utc)
+    dt = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _sky_payload(t: datetime, mag_limit: float, limit: int) -> dict:
+    t_jd = julian_day_from_datetime(t)
+    result = visible_from_earth(cached_catalog(settings.SOLAR_READ_DB), t_jd, mag_limit, limit)
+    ids = [int(x) for x in result.ids]
+    meta = {o["id"]: o for o in _bodies().filter(id__in=ids).values("id", "name", "spkid", "category")}
+    objects = []
+    for k, pk in enumerate(ids):
+        if pk not in meta:
+            continue
+        objects.append(
+            {
+                **meta[pk],
+                "ra_deg": float(result.ra_deg[k]),
+                "dec_deg": float(result.dec_deg[k]),
+                "delta_au": float(result.delta_au[k]),
+                "r_au": float(result.r_au[k]),
+                "phase_deg": float(result.phase_deg[k]),
+                "elong_deg": float(result.elong_deg[k]),
+                "V": float(result.V[k]),
+            }
+        )
+    return {
+        "t": t.isoformat(),
+        "jd": t_jd,
+        "mag_limit": mag_limit,
+        "total": result.total,
+        "candidates": result.candidates,
+        "count": result.brighter,
+        # Bodies left out because their mean anomaly was not in the imported dataset.
+        "unknown_phase": result.unknown_phase,
+        "objects": objects,
+    }
+
+
+async def sky(request: HttpRequest) -> JsonResponse:
+    try:
+        t = _parse_time(request.GET.get("t"))
+        mag_limit = float(request.GET.get("mag_limit", "12"))
+        limit = max(1, min(1000, int(request.GET.get("limit", "100"))))
+        if not math.isfinite(mag_limit):
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"detail": "t must be ISO-8601; mag_limit and limit must be finite numbers."}, status=400)
+    try:
+        async with HeavySlot() as slot:
+            payload = await slot.run_thread(_sky_payload, t, mag_limit, limit)
+    except (ComputeBusy, ComputeTimeout) as exc:
+        return _heavy_error(exc)
+    return JsonResponse(payload)
 
 
 @api_view(["GET"])
 def stats(request: Request) -> Response:
     by_cat = {
-        c: SmallBody.objects.filter(category=c).count()
+        c: _bodies().filter(category=c).count()
         for c in ["mainbelt", "neo", "trojan", "comet", "other"]
     }
     return Response({"counts": by_cat, "total": sum(by_cat.values())})
+
+
+@api_view(["GET"])
+def db_metrics(request: Request) -> Response:
+    snapshot = query_metrics.snapshot()
+    if request.query_params.get("reset"):
+        query_metrics.reset()
+    return Response({**snapshot, "heavy_inflight": compute_inflight()})
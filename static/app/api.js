@@ -10,7 +10,14 @@ export const api = {
   random: (category) => jget(`/api/random/?category=${encodeURIComponent(category)}`),
   search: (q) => jget(`/api/search/?q=${encodeURIComponent(q)}`),
   object: (id) => jget(`/api/object/${encodeURIComponent(id)}/`),
-  ephemeris: (id, { start, stop, step = "1d" }) =>
-    jget(`/api/object/${encodeURIComponent(id)}/ephemeris/?start=${start}&stop=${stop}&step=${encodeURIComponent(step)}`),
+  // Positions are heliocentric ecliptic AU. gm picks the central mass: "scene" (mu=1, the
+  // animation's units, kepler only) or "sun" (real GM, always used by model=nbody). Compare
+  // kepler and nbody with gm="sun"; the response echoes gm and mu_au3_per_yr2.
+  ephemeris: (id, { start, stop, step = "1d", model = "kepler", gm }) =>
+    jget(`/api/object/${encodeURIComponent(id)}/ephemeris/?start=${start}&stop=${stop}&step=${encodeURIComponent(step)}&model=${model}${gm ? `&gm=${gm}` : ""}`),
+  sky: ({ t, magLimit = 12, limit = 100 } = {}) =>
+    jget(`/api/sky/?mag_limit=${magLimit}&limit=${limit}${t ? `&t=${encodeURIComponent(t)}` : ""}`),
+  ephemerisBatch: (ids, { start, stop, step = "1d", model = "kepler", gm }) =>
+    jget(`/api/ephemeris/?ids=${encodeURIComponent(ids.join(","))}&start=${start}&stop=${stop}&step=${encodeURIComponent(step)}&model=${model}${gm ? `&gm=${gm}` : ""}`),
 };
 
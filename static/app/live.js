@@ -0,0 +1,63 @@
+// Client for the server-side position stream (solar/live.py).
+// Positions are in the same units as orbitMath.js (AU, mu=1), in ecliptic x/y/z.
+
+const HEADER_BYTES = 32;
+const KIND_KEY = 0;
+const KIND_DELTA = 1;
+
+function wsUrl(path) {
+  const proto = location.protocol === "https:" ? "wss:" : "ws:";
+  return `${proto}//${location.host}${path}`;
+}
+
+function readHeader(view) {
+  const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+  if (magic !== "AVPF") throw new Error("bad frame");
+  return {
+    kind: view.getUint8(5),
+    tick: view.getUint32(8, true),
+    prevTick: view.getUint32(12, true),
+    count: view.getUint32(16, true),
+    jd: view.getFloat64(20, true),
+    scale: view.getFloat32(28, true),
+  };
+}
+
+// subscription: { ids } or { layers, limit }, plus { rate, fps }.
+// onFrame({ ids, jd, tick, positions }) gets a Float32Array of xyz triples, reused between frames.
+export function subscribePositions(subscription, onFrame, { ackWindow = 2, onError } = {}) {
+  const ws = new WebSocket(wsUrl("/ws/positions/"));
+  ws.binaryType = "arraybuffer";
+  let ids = [];
+  let positions = null;
+  let lastTick = -1;
+
+  ws.addEventListener("open", () => ws.send(JSON.stringify({ ...subscription, ack: ackWindow })));
+  ws.addEventListener("message", (ev) => {
+    if (typeof ev.data === "string") {
+      const msg = JSON.parse(ev.data);
+      if (msg.type === "subscribed") ids = msg.ids;
+      else if (msg.type === "error" && onError) onError(new Error(msg.detail));
+      return;
+    }
+    const view = new DataView(ev.data);
+    const h = readHeader(view);
+    if (h.kind === KIND_KEY) {
+      positions = new Float32Array(ev.data.slice(HEADER_BYTES));
+    } else if (h.kind === KIND_DELTA && positions && lastTick === h.prevTick) {
+      const q = new Int16Array(ev.data, HEADER_BYTES, h.count * 3);
+      // Math.fround mirrors the server's float32 arithmetic so deltas never drift.
+      for (let k = 0; k < q.length; k++) positions[k] = Math.fround(positions[k] + Math.fround(q[k] * h.scale));
+    } else {
+      return;
+    }
+    lastTick = h.tick;
+    onFrame({ ids, jd: h.jd, tick: h.tick, positions });
+    ws.send(JSON.stringify({ ack: h.tick }));
+  });
+  ws.addEventListener("close", (ev) => {
+    if (ev.code !== 1000 && onError) onError(new Error(`position stream closed (${ev.code})`));
+  });
+
+  return { close: () => ws.close(1000) };
+}